@@ -0,0 +1,160 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """Answer cache keyed on question embeddings.
+
+    A question whose embedding has cosine similarity >= `threshold` with a
+    cached question returns the stored answer and sources instead of running
+    retrieval + generation again. Entries expire after `ttl` seconds and the
+    least recently used entry is replaced beyond `max_entries`.
+
+    The threshold depends on the embedding model: general LLM embeddings
+    such as llama3.1's place unrelated questions at high cosine similarity,
+    so check the scores of paraphrases against unrelated questions before
+    relying on the default.
+
+    Normalised embeddings live in one preallocated float32 matrix that is
+    updated in place, row i belonging to `entries[i]`. Both are saved
+    together in a single .npz at `path` – in a background thread, at most
+    every `save_delay` seconds and at exit – so answering a question never
+    waits for the write.
+
+    Each cache belongs to one version of the vector index: `bind()` drops
+    every entry when the index version changes, since answers built on the
+    old chunks may no longer be right.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        threshold: float = 0.95,
+        ttl: float = 24 * 3600,
+        max_entries: int = 1000,
+        save_delay: float = 30.0,
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.save_delay = save_delay
+        self.index_version = None
+        self.entries = []
+        self._matrix = None  # (max_entries, dim) normalised embeddings
+        self._lock = threading.Lock()
+        self._timer = None
+        self._dirty = False
+        self.load()
+        atexit.register(self.save)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        with np.load(self.path) as data:
+            meta = json.loads(str(data["meta"]))
+            embeddings = data["embeddings"]
+        self.index_version = meta["index_version"]
+        self.entries = meta["entries"][: self.max_entries]
+        if self.entries:
+            self._allocate(embeddings.shape[1])
+            self._matrix[: len(self.entries)] = embeddings[: len(self.entries)]
+
+    def save(self):
+        """Write entries and embeddings to `path` if anything changed."""
+        with self._lock:
+            self._timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            meta = {"index_version": self.index_version, "entries": [dict(e) for e in self.entries]}
+            n = len(self.entries)
+            embeddings = self._matrix[:n].copy() if n else np.zeros((0, 0), dtype=np.float32)
+        tmp_path = self.path + ".tmp.npz"
+        np.savez(tmp_path, embeddings=embeddings, meta=np.array(json.dumps(meta)))
+        os.replace(tmp_path, self.path)
+
+    def _changed(self):
+        """Mark the cache dirty and schedule a background save (lock held)."""
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.save_delay, self.save)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def bind(self, index_version: str):
+        """Attach the cache to an index version, clearing it if it changed."""
+        with self._lock:
+            if self.index_version != index_version:
+                if self.entries:
+                    print(f"🧹 Index changed – dropping {len(self.entries)} cached answers")
+                self.index_version = index_version
+                self.entries = []
+                self._changed()
+
+    # ------------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _normalise(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _allocate(self, dim: int):
+        if self._matrix is None or self._matrix.shape[1] != dim:
+            self._matrix = np.zeros((self.max_entries, dim), dtype=np.float32)
+
+    def _expire(self):
+        now = time.time()
+        keep = [i for i, e in enumerate(self.entries) if now - e["created"] < self.ttl]
+        if len(keep) != len(self.entries):
+            self._matrix[: len(keep)] = self._matrix[keep]
+            self.entries = [self.entries[i] for i in keep]
+            self._changed()
+
+    def lookup(self, embedding):
+        """Return the best cached entry above the threshold, or None."""
+        query = self._normalise(embedding)
+        with self._lock:
+            self._expire()
+            if not self.entries or self._matrix.shape[1] != len(query):
+                return None
+            scores = self._matrix[: len(self.entries)] @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            entry = self.entries[best]
+            entry["last_used"] = time.time()
+            return entry
+
+    def store(self, question: str, embedding, answer: str, sources: list[dict]):
+        vector = self._normalise(embedding)
+        now = time.time()
+        entry = {
+            "question": question,
+            "answer": answer,
+            "sources": sources,
+            "created": now,
+            "last_used": now,
+        }
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != len(vector):
+                self._allocate(len(vector))
+                self.entries = []  # embedding model changed
+            if len(self.entries) < self.max_entries:
+                row = len(self.entries)
+                self.entries.append(entry)
+            else:  # replace the least recently used entry
+                row = min(range(len(self.entries)), key=lambda i: self.entries[i]["last_used"])
+                self.entries[row] = entry
+            self._matrix[row] = vector
+            self._changed()
@@ -1,13 +1,11 @@
 from dotenv import load_dotenv
-from langchain.agents import create_agent
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_core.tools import create_retriever_tool
+
+from launcher import Lazy, lazy_import, startup_report
 
 load_dotenv()
 
-embeddings = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
+# heavy packages are imported on first use, see launcher.py
+genai = lazy_import("langchain_google_genai")
 
 texts = [
     'I love apples.',
@@ -20,29 +18,74 @@ texts = [
     'Linux is a great operating system.'
 ]
 
-vector_store = FAISS.from_texts(texts, embeddings)
+def build_vector_store():
+    from embedding_pipeline import BatchedEmbeddings
+    from replay import replayable
+    from vector_index import IndexConfig, build_vectorstore
+
+    embeddings = BatchedEmbeddings(
+        replayable(genai.GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001"), "basic_rag_embeddings"),
+        batch_size=16,
+        max_concurrency=4,
+    )
+    # stays an exact flat index until the corpus reaches train_min chunks,
+    # then an IVF quantizer is trained and searched with nprobe cells
+    return build_vectorstore(texts, embeddings, IndexConfig(kind="ivf", nprobe=16))
+
+# built on first use – __main__ prefetches it so the embedding round trips
+# run in the background while the agent stack imports
+vector_store = Lazy(build_vector_store, "vector store")
 
 # print(vector_store.similarity_search('Apples are my favorite food.', k=7))
 # print(vector_store.similarity_search('Linux is a great operating system.', k=7))
 
-retriever = vector_store.as_retriever(search_kwargs={'k': 3})
+# made a LangChain tool in build_agent(), langchain_core alone costs ~0.5s to import
+def retriever_tool(queries: list[str]) -> str:
+    from vector_index import batch_search
+
+    # one embedding round trip + one vectorised FAISS search for all queries
+    results = batch_search(vector_store.get(), queries, k=3)
+    return "\n\n".join(
+        f"Results for {query!r}:\n" + "\n".join(f"- {doc.page_content}" for doc in docs)
+        for query, docs in zip(queries, results)
+    )
+
+def build_agent():
+    from langchain.agents import create_agent
+    from langchain_core.tools import tool
+    from parallel_tools import ParallelToolMiddleware
+    from prompt_cache import PromptCacheMiddleware
+    from replay import replayable
 
-retriever_tool = create_retriever_tool(retriever, name='kb_search', description='search small product / fruit database for information.')
+    llm = replayable(genai.ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.3), "basic_rag")
 
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.3)
+    return create_agent(
+        model = llm,
+        tools = [
+            tool(
+                'kb_search',
+                description='search small product / fruit database for information. Pass every query you need as a list in ONE call.',
+            )(retriever_tool)
+        ],
+        system_prompt=(
+            "You are a helpful assistant. For questions about Macs, apples, or laptops, "
+            "First call the kb_search tool to retrieve context, then answer succinctly. If you need several searches, pass all queries to kb_search in a single call."
+    ),
+        middleware=[
+            PromptCacheMiddleware(gemini_cache_ttl="3600s"),
+            ParallelToolMiddleware(max_concurrency=4, timeouts={"kb_search": 10}),
+        ],
+    )
 
-agent = create_agent(
-    model = llm,
-    tools = [retriever_tool],
-    system_prompt=(
-        "You are a helpful assistant. For questions about Macs, apples, or laptops, "
-        "First call the kb_search tool to retrieve context, then answer succinctly. Maybe you have to use it multiple times before answering."
-),
-)
+agent = Lazy(build_agent, "agent")
 
-result = agent.invoke({
-    "messages": [{"role": "user", "content": "What three fruits does the person like and what three fruits does the person dislike?"}]
-})
+if __name__ == "__main__":
+    from parallel_tools import parallel_config
 
+    vector_store.prefetch()
+    result = agent.get().invoke({
+        "messages": [{"role": "user", "content": "What three fruits does the person like and what three fruits does the person dislike?"}]
+    }, config=parallel_config(4))
 
-print(result["messages"][-1].content)
\ No newline at end of file
+    print(result["messages"][-1].content)
+    startup_report()
\ No newline at end of file
@@ -0,0 +1,214 @@
+# --------------------------------------------------
+# Docstore benchmark: InMemoryDocstore vs ChunkStore
+# --------------------------------------------------
+# Fills both stores with the same synthetic chunks, carrying the metadata
+# PyPDFLoader produces (source, page, page_label, total_pages, producer,
+# creator, author, title, creationdate, moddate), and reports Python heap
+# and RSS growth per chunk plus the cost of materialising the k hits of a
+# query. The heap figures are extrapolated to --project chunks.
+#
+# The "chatbot" runs measure everything DocumentQAChatbot keeps per chunk
+# with hybrid=True: the FAISS index and its index_to_docstore_id dict, the
+# docstore and the BM25 index, filled batch by batch like index_files().
+# Vectors come from the hashing embedder in bench_retrieval.py; faiss
+# allocates them outside the Python heap, so they show up in the RSS and
+# index figures only. Every run gets a fresh process, so RSS is its own.
+#
+#   python bench_chunk_store.py --chunks 200000 --output bench_chunk_store.json
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+from bench_retrieval import HashingEmbeddings, percentiles, synthetic_corpus
+from chunk_store import ChunkStore
+from hybrid_retrieval import BM25Index
+from vector_index import DeletableFAISS
+
+ROMAN = ["i", "ii", "iii", "iv", "v", "vi", "vii", "viii"]
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def file_metadata(file_no: int) -> dict:
+    """Document-level fields PyPDFLoader copies onto every page of a file."""
+    rng = random.Random(file_no)
+    created = f"20{rng.randrange(10, 25)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}"
+    return {
+        "source": f"/data/manuals/manual-{file_no:05d}.pdf",
+        "producer": rng.choice(
+            ["pdfTeX-1.40.25", "Microsoft® Word for Microsoft 365", "Acrobat Distiller 11.0"]
+        ),
+        "creator": rng.choice(
+            ["LaTeX with hyperref", "Microsoft® Word for Microsoft 365", "Adobe InDesign 18.2"]
+        ),
+        "author": f"Service Engineering {rng.randrange(100)}",
+        "title": f"Maintenance manual {file_no}",
+        "creationdate": f"{created}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:00+00:00",
+        "moddate": f"{created}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:30+00:00",
+        "total_pages": rng.randrange(40, 600),
+        "front_matter": rng.randrange(len(ROMAN) + 1),  # pages numbered i, ii, … first
+    }
+
+
+def page_label(page: int, front_matter: int) -> str:
+    return ROMAN[page] if page < front_matter else str(page - front_matter + 1)
+
+
+def batches(n: int, files: int, batch: int = 10_000):
+    """(id, Document) batches; ids are sha256-sized like chunk_id()."""
+    per_file = max(1, n // files)
+    file_meta = {}
+    for offset in range(0, n, batch):
+        texts = synthetic_corpus(min(batch, n - offset), seed=offset, words_per_chunk=150)
+        docs = {}
+        for i, text in enumerate(texts, offset):
+            file_no = min(i // per_file, files - 1)
+            meta = file_meta.get(file_no)
+            if meta is None:
+                meta = file_meta[file_no] = file_metadata(file_no)
+            front_matter = meta["front_matter"]
+            page = (i - file_no * per_file) // 3 % meta["total_pages"]  # ~3 chunks per page
+            metadata = {key: value for key, value in meta.items() if key != "front_matter"}
+            metadata["page"] = page
+            metadata["page_label"] = page_label(page, front_matter)
+            docs[f"{i:064x}"] = Document(page_content=text, metadata=metadata)
+        yield docs
+
+
+def fill(store, n: int, files: int) -> dict:
+    tracemalloc.start()
+    rss = rss_mb()
+    start = time.perf_counter()
+    for docs in batches(n, files):
+        store.add(docs)
+    del docs  # only what the store keeps should count
+    if isinstance(store, ChunkStore):
+        store.flush()
+    seconds = time.perf_counter() - start
+    heap, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "build_s": round(seconds, 2),
+        "heap_bytes_per_chunk": round(heap / n, 1),
+        "rss_growth_mb": round(rss_mb() - rss, 1),
+    }
+
+
+def fill_chatbot(n: int, files: int, dim: int, directory: str | None) -> dict:
+    """Build the chatbot's retrieval state the way index_files() does."""
+    embeddings = HashingEmbeddings(dim)
+    tracemalloc.start()
+    rss = rss_mb()
+    start = time.perf_counter()
+    store, bm25 = None, BM25Index()
+    for docs in batches(n, files):
+        ids, chunks = list(docs), list(docs.values())
+        if store is None:
+            extra = {"docstore": ChunkStore.create(directory)} if directory else {}
+            store = DeletableFAISS.from_documents(chunks, embeddings, ids=ids, **extra)
+        else:
+            store.add_documents(chunks, ids=ids)
+        for doc_id, chunk in docs.items():
+            bm25.add(doc_id, chunk.page_content)
+    del docs, ids, chunks
+    if directory:
+        store.docstore.flush()
+    seconds = time.perf_counter() - start
+    snapshot = tracemalloc.take_snapshot()
+    heap, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    bm25_heap = sum(
+        stat.size
+        for stat in snapshot.filter_traces([tracemalloc.Filter(True, "*hybrid_retrieval.py")])
+        .statistics("filename")
+    )
+    return {
+        "build_s": round(seconds, 2),
+        "heap_bytes_per_chunk": round(heap / n, 1),
+        "bm25_heap_bytes_per_chunk": round(bm25_heap / n, 1),
+        "index_bytes_per_chunk": store.index.ntotal * store.index.d * 4 // n,
+        "rss_growth_mb": round(rss_mb() - rss, 1),
+    }
+
+
+def lookups(store, n: int, k: int, queries: int) -> dict:
+    rng = random.Random(0)
+    samples = []
+    for _ in range(queries):
+        ids = [f"{rng.randrange(n):064x}" for _ in range(k)]
+        start = time.perf_counter()
+        docs = [store.search(doc_id) for doc_id in ids]
+        samples.append(time.perf_counter() - start)
+        assert all(isinstance(doc, Document) for doc in docs)
+    return {f"top{k}": percentiles(samples)}
+
+
+def run(kind: str, args: argparse.Namespace) -> dict:
+    """One measurement; run in a fresh process so RSS and allocator slack start clean."""
+    directory = tempfile.mkdtemp(prefix="chunk_store_")
+    try:
+        if kind.startswith("chatbot"):
+            compact = kind == "chatbot_chunk_store"
+            return fill_chatbot(args.chunks, args.files, args.dim, directory if compact else None)
+        store = ChunkStore.create(directory) if kind == "chunk_store" else InMemoryDocstore()
+        stats = fill(store, args.chunks, args.files)
+        stats.update(lookups(store, args.chunks, args.k, args.queries))
+        if kind == "chunk_store":
+            disk = sum(entry.stat().st_size for entry in os.scandir(directory))
+            stats["disk_mb"] = round(disk / (1024 * 1024), 1)
+            stats["metadata_templates"] = len(store.metas)
+            stats["page_labels"] = len(store.labels)
+        return stats
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Docstore memory / lookup benchmark")
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=256, help="embedding size for the chatbot runs")
+    parser.add_argument("--project", type=int, default=1_000_000)
+    parser.add_argument("--output", default="bench_chunk_store.json")
+    args = parser.parse_args()
+
+    results = {}
+    spawn = multiprocessing.get_context("spawn")
+    for kind in ("in_memory", "chunk_store", "chatbot_in_memory", "chatbot_chunk_store"):
+        print(f"📏 {kind}")
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+            results[kind] = pool.submit(run, kind, args).result()
+
+    report = {
+        "chunks": args.chunks,
+        **results,
+        "heap_ratio": round(
+            results["in_memory"]["heap_bytes_per_chunk"] / results["chunk_store"]["heap_bytes_per_chunk"], 1
+        ),
+        f"projected_heap_mb_{args.project}": {
+            name: round(stats["heap_bytes_per_chunk"] * args.project / (1024 * 1024))
+            for name, stats in results.items()
+        },
+    }
+    print(json.dumps(report, indent=2))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# --------------------------------------------------
+# Offline retrieval benchmark for the RAG paths
+# --------------------------------------------------
+# Runs without network or Ollama: chunks are synthetic and embedded with a
+# deterministic hashing embedder. For each corpus size it measures
+#   * the LangChain path used by basic_rag.py / DocumentQAChatbot
+#     (FAISS.from_texts + as_retriever) – build time and query latency;
+#   * raw FAISS index types (flat, IVF, HNSW, PQ) – build time, index size,
+#     query latency percentiles and recall@k against exact search.
+# Each size runs in a fresh process, so its peak RSS is its own. Results
+# are written as JSON so runs can be diffed for regressions:
+#
+#   python bench_retrieval.py --sizes 1000 10000 100000 --output bench.json
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+WORDS = (
+    "pump valve sensor error code manual reset pressure voltage fan motor "
+    "filter cable relay fuse board panel display alarm temperature spindle "
+    "bearing gasket seal torque calibration firmware boot network port "
+    "cooling drive belt gear switch lamp circuit controller module unit"
+).split()
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embedder: each token hashes to a signed dimension.
+
+    Similar texts share tokens and so get similar vectors, which keeps
+    recall numbers meaningful, and no model or network is involved.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in text.lower().split():
+            h = hash_token(token)
+            vector[h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text).tolist() for text in texts]
+
+    def embed_matrix(self, texts: list[str]) -> np.ndarray:
+        """float32 (len(texts), dim) array without intermediate Python floats –
+        embed_documents' lists cost ~32 bytes per value."""
+        matrix = np.empty((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            matrix[row] = self._embed(text)
+        return matrix
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text).tolist()
+
+
+@lru_cache(maxsize=65536)
+def hash_token(token: str) -> int:
+    # FNV-1a – stable across processes, unlike the built-in hash()
+    h = 0x811C9DC5
+    for byte in token.encode():
+        h = ((h ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return h
+
+
+def synthetic_corpus(n: int, seed: int = 0, words_per_chunk: int = 40) -> list[str]:
+    rng = np.random.default_rng(seed)
+    vocab = WORDS + [f"E{code:04d}" for code in range(2000)]  # part numbers / error codes
+    picks = rng.integers(0, len(vocab), size=(n, words_per_chunk))
+    return [" ".join(vocab[i] for i in row) for row in picks]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+
+def percentiles(samples: list[float]) -> dict:
+    ms = np.asarray(samples) * 1000
+    return {f"p{q}_ms": round(float(np.percentile(ms, q)), 4) for q in (50, 95, 99)}
+
+
+def index_spec(kind: str, n: int, dim: int) -> str:
+    nlist = max(1, int(4 * np.sqrt(n)))
+    return {
+        "flat": "Flat",
+        "ivf": f"IVF{nlist},Flat",
+        "hnsw": "HNSW32",
+        "pq": f"IVF{nlist},PQ{dim // 8}",
+    }[kind]
+
+
+def bench_index(kind, vectors, queries, exact, ks, nprobe, ef_search):
+    n, dim = vectors.shape
+    spec = index_spec(kind, n, dim)
+    index = faiss.index_factory(dim, spec)
+    start = time.perf_counter()
+    if not index.is_trained:
+        sample = vectors[np.random.default_rng(1).permutation(n)[: min(n, 100_000)]]
+        index.train(sample)
+    index.add(vectors)
+    build_s = time.perf_counter() - start
+    if "IVF" in spec:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    if kind == "hnsw":
+        index.hnsw.efSearch = ef_search
+
+    k_max = max(ks)
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k_max)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+    found = np.stack(found)
+    recall = {
+        f"recall@{k}": round(
+            float(np.mean([len(set(f[:k]) & set(e[:k])) / k for f, e in zip(found, exact)])), 4
+        )
+        for k in ks
+    }
+    return {
+        "spec": spec,
+        "build_s": round(build_s, 4),
+        "index_bytes": int(faiss.serialize_index(index).nbytes),
+        **percentiles(latencies),
+        **recall,
+    }
+
+
+def bench_langchain(texts, query_texts, embeddings, k):
+    start = time.perf_counter()
+    store = FAISS.from_texts(texts, embeddings)
+    build_s = time.perf_counter() - start
+    retriever = store.as_retriever(search_kwargs={"k": k})
+    latencies = []
+    for query in query_texts:
+        start = time.perf_counter()
+        retriever.invoke(query)
+        latencies.append(time.perf_counter() - start)
+    return {"build_s": round(build_s, 4), "k": k, **percentiles(latencies)}
+
+
+def bench_size(n: int, args: argparse.Namespace) -> dict:
+    print(f"📏 {n:,} chunks")
+    embeddings = HashingEmbeddings(args.dim)
+    texts = synthetic_corpus(n)
+    query_texts = synthetic_corpus(args.queries, seed=42, words_per_chunk=8)
+    vectors = embeddings.embed_matrix(texts)
+    queries = embeddings.embed_matrix(query_texts)
+
+    exact_index = faiss.IndexFlatL2(args.dim)
+    exact_index.add(vectors)
+    _, exact = exact_index.search(queries, max(args.k))
+    del exact_index
+
+    run = {"chunks": n, "vector_bytes": int(vectors.nbytes), "indexes": {}}
+    for kind in args.index_types:
+        run["indexes"][kind] = bench_index(
+            kind, vectors, queries, exact, args.k, args.nprobe, args.ef_search
+        )
+        print(f"   {kind:5s} {run['indexes'][kind]}")
+    if n <= args.langchain_max:
+        run["langchain_faiss"] = bench_langchain(texts, query_texts, embeddings, k=3)
+        print(f"   langchain {run['langchain_faiss']}")
+    run["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 10])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--index-types", nargs="+", default=["flat", "ivf", "hnsw", "pq"])
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument(
+        "--langchain-max", type=int, default=100_000,
+        help="largest corpus also run through FAISS.from_texts (docstore of Documents)",
+    )
+    parser.add_argument("--output", default="bench_retrieval.json")
+    args = parser.parse_args()
+
+    report = {"created": time.time(), "config": vars(args), "runs": []}
+    spawn = multiprocessing.get_context("spawn")
+    for n in args.sizes:
+        # a fresh interpreter per size: ru_maxrss never goes down
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+            report["runs"].append(pool.submit(bench_size, n, args).result())
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
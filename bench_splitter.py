@@ -0,0 +1,110 @@
+# --------------------------------------------------
+# Splitter benchmark: RecursiveCharacterTextSplitter vs FastSplitter
+# --------------------------------------------------
+# Splits the same pages with the LangChain splitter used by
+# DocumentQAChatbot, with FastSplitter in one process and with
+# FastSplitter across worker processes, checks that the chunks are
+# byte-identical and reports pages/s. Runs offline on synthetic pages, or
+# on a real PDF with --pdf.
+#
+#   python bench_splitter.py --pages 5000 --output bench_splitter.json
+import argparse
+import json
+import random
+import time
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from fast_splitter import FastSplitter, parallel_split
+
+WORDS = (
+    "the pump must be reset after error E-1042 check valve pressure and "
+    "voltage before replacing the relay fuse or controller board"
+).split()
+
+
+def synthetic_pages(n: int, seed: int = 0) -> list[Document]:
+    rng = random.Random(seed)
+    pages = []
+    for page in range(n):
+        paragraphs = []
+        for _ in range(rng.randint(3, 12)):
+            lines = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))
+                for _ in range(rng.randint(1, 8))
+            ]
+            paragraphs.append("\n".join(lines))
+        pages.append(
+            Document(page_content="\n\n".join(paragraphs), metadata={"source": "synthetic", "page": page})
+        )
+    return pages
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text splitter benchmark")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--pdf", help="benchmark on the pages of this PDF instead")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="bench_splitter.json")
+    args = parser.parse_args()
+
+    if args.pdf:
+        from langchain_community.document_loaders import PyPDFLoader
+
+        pages = PyPDFLoader(args.pdf).load()
+    else:
+        pages = synthetic_pages(args.pages)
+    sizes = {"chunk_size": args.chunk_size, "chunk_overlap": args.chunk_overlap}
+
+    langchain = RecursiveCharacterTextSplitter(length_function=len, **sizes)
+    reference, reference_s = timed(lambda: langchain.split_documents(pages))
+    fast, fast_s = timed(lambda: FastSplitter(**sizes).split_documents(pages))
+    parallel, parallel_s = timed(
+        lambda: parallel_split(pages, max_workers=args.workers, **sizes)
+    )
+    try:
+        tokens, tokens_s = timed(
+            lambda: FastSplitter(length_unit="tokens", chunk_size=256, chunk_overlap=50).split_documents(pages)
+        )
+    except Exception as e:  # tiktoken missing or its encoding not downloadable
+        print(f"⚠️  Token mode skipped: {e.__class__.__name__}")
+        tokens, tokens_s = None, None
+
+    identical = [c.page_content for c in reference] == [c.page_content for c in fast] == [
+        c.page_content for c in parallel
+    ]
+    report = {
+        "pages": len(pages),
+        "chunks": len(reference),
+        "identical": identical,
+        "seconds": {
+            "langchain": round(reference_s, 4),
+            "fast": round(fast_s, 4),
+            "fast_parallel": round(parallel_s, 4),
+            "fast_tokens_256": tokens_s and round(tokens_s, 4),
+        },
+        "pages_per_s": {
+            "langchain": round(len(pages) / reference_s, 1),
+            "fast": round(len(pages) / fast_s, 1),
+            "fast_parallel": round(len(pages) / parallel_s, 1),
+        },
+        "token_mode_chunks": tokens and len(tokens),
+    }
+    print(json.dumps(report, indent=2))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    if not identical:
+        raise SystemExit("❌ FastSplitter output differs from RecursiveCharacterTextSplitter")
+
+
+if __name__ == "__main__":
+    main()
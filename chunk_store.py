@@ -0,0 +1,294 @@
+import array
+import json
+import mmap
+import os
+import shutil
+import threading
+
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+
+class ChunkStore(Docstore, AddableMixin):
+    """Compact, disk-backed replacement for FAISS's InMemoryDocstore.
+
+    Instead of one `Document` per chunk on the Python heap, a directory
+    holds:
+        text.N.bin every chunk's UTF-8 text, appended back to back and
+                   memory-mapped for reads (N grows with each compaction);
+        store.G.npz per-row columns – byte offset and length into the text,
+                   file id, page number, page-label id, metadata-template
+                   id – plus the chunk ids as a sorted fixed-width byte
+                   array with their rows, the file path and page label
+                   tables and the metadata templates.
+
+    `source`, integer `page` and `page_label` become int columns (labels
+    such as "iv" or "12" are interned, they repeat across files); the
+    remaining metadata (producer, dates, total_pages… – the same for every
+    chunk of a file with PyPDFLoader) is stored once per distinct value.
+    Values that are not JSON types come back as str.
+    A `Document` is built only when `search()` asks for an id, i.e. for the
+    k hits of a query, so heap use is ~100 bytes per chunk instead of
+    several kilobytes.
+
+    New ids wait in a small dict and are merged into the sorted arrays
+    every `merge_every` additions and on `flush()`. Deleted chunks leave
+    dead bytes in the text file; `flush()` rewrites it to the next
+    generation once more than half of it is dead.
+
+    Every `flush()` writes a new snapshot, store.G.npz, naming its text
+    file; earlier snapshots and text files stay readable until `prune()`.
+    Pickling (FAISS.save_local) flushes and stores the directory path and
+    the snapshot name, so an index saved earlier keeps opening the state
+    it was saved with. Call `prune()` only once the new index is in
+    place: a crash before that leaves the old index and its snapshot
+    intact.
+    """
+
+    def __init__(self, path: str, merge_every: int = 65536, snapshot: str | None = None):
+        self.path = os.path.abspath(path)
+        self.merge_every = merge_every
+        self._lock = threading.RLock()
+        os.makedirs(self.path, exist_ok=True)
+        self._open(snapshot or self._latest_snapshot())
+
+    @classmethod
+    def create(cls, path: str, **kwargs) -> "ChunkStore":
+        """A new, empty store at `path`, replacing whatever was there."""
+        shutil.rmtree(path, ignore_errors=True)
+        return cls(path, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _latest_snapshot(self) -> str | None:
+        generations = [
+            int(name.split(".")[1])
+            for name in os.listdir(self.path)
+            if name.startswith("store.") and name.endswith(".npz") and name.split(".")[1].isdigit()
+        ]
+        return f"store.{max(generations)}.npz" if generations else None
+
+    def _open(self, snapshot: str | None):
+        self.starts = array.array("q")
+        self.lengths = array.array("i")
+        self.file_ids = array.array("i")
+        self.pages = array.array("i")
+        self.label_ids = array.array("i")
+        self.meta_ids = array.array("i")
+        self.keys = np.array([], dtype="S1")  # sorted chunk ids
+        self.key_rows = np.array([], dtype=np.int64)
+        self.pending = {}  # id -> row, not merged into keys yet
+        self.files, self.labels, self.metas = [], [], []
+        self.dead_bytes = 0
+        self.text_name = "text.0.bin"
+        self.snapshot = snapshot
+        if snapshot is not None:
+            with np.load(self._file(snapshot)) as data:
+                for name in ("starts", "lengths", "file_ids", "pages", "label_ids", "meta_ids"):
+                    getattr(self, name).frombytes(data[name].tobytes())
+                self.keys = data["keys"]
+                self.key_rows = data["key_rows"]
+                tables = json.loads(str(data["tables"]))
+            self.files, self.labels, self.metas = tables["files"], tables["labels"], tables["metas"]
+            self.dead_bytes = tables["dead_bytes"]
+            self.text_name = tables["text"]
+        self._file_index = {path: i for i, path in enumerate(self.files)}
+        self._label_index = {label: i for i, label in enumerate(self.labels)}
+        self._meta_index = {meta: i for i, meta in enumerate(self.metas)}
+        self._meta_dicts = {}  # parsed templates, copied per hit
+        self._writer = open(self._file(self.text_name), "ab")
+        self._size = self._writer.tell()  # may include bytes written after the last flush
+        self._mm = None
+
+    def _text(self, row: int) -> str:
+        start, length = self.starts[row], self.lengths[row]
+        if self._mm is None or start + length > len(self._mm):
+            self._writer.flush()
+            if self._mm is not None:
+                self._mm.close()
+            with open(self._file(self.text_name), "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm[start : start + length].decode()
+
+    def _merge(self):
+        if not self.pending:
+            return
+        new_keys = np.array([key.encode() for key in self.pending])
+        new_rows = np.fromiter(self.pending.values(), dtype=np.int64, count=len(self.pending))
+        keys = np.concatenate([self.keys, new_keys]) if len(self.keys) else new_keys
+        rows = np.concatenate([self.key_rows, new_rows])
+        order = np.argsort(keys, kind="stable")
+        self.keys, self.key_rows = keys[order], rows[order]
+        self.pending = {}
+
+    def flush(self):
+        """Write everything to disk as the next snapshot (see `prune()`)."""
+        with self._lock:
+            self._merge()
+            if self.dead_bytes and self.dead_bytes * 2 > self._size:
+                self.compact()
+            self._writer.flush()
+            tables = {
+                "files": self.files,
+                "labels": self.labels,
+                "metas": self.metas,
+                "dead_bytes": self.dead_bytes,
+                "text": self.text_name,
+            }
+            tmp = self._file("store.tmp.npz")
+            np.savez(
+                tmp,
+                starts=np.frombuffer(self.starts, dtype=np.int64),
+                lengths=np.frombuffer(self.lengths, dtype=np.int32),
+                file_ids=np.frombuffer(self.file_ids, dtype=np.int32),
+                pages=np.frombuffer(self.pages, dtype=np.int32),
+                label_ids=np.frombuffer(self.label_ids, dtype=np.int32),
+                meta_ids=np.frombuffer(self.meta_ids, dtype=np.int32),
+                keys=self.keys,
+                key_rows=self.key_rows,
+                tables=np.array(json.dumps(tables)),
+            )
+            generation = int(self.snapshot.split(".")[1]) + 1 if self.snapshot else 0
+            self.snapshot = f"store.{generation}.npz"
+            os.replace(tmp, self._file(self.snapshot))
+
+    def prune(self):
+        """Delete the snapshots and text files older than the last flush."""
+        with self._lock:
+            keep = {self.snapshot, self.text_name}
+            for name in os.listdir(self.path):
+                if name.startswith(("store.", "text.")) and name not in keep:
+                    os.remove(self._file(name))
+
+    def compact(self):
+        """Copy live chunks to the next text file and rebuild the columns.
+
+        Call through `flush()`; the old file stays until `prune()`, for the
+        snapshots that still point at it.
+        """
+        with self._lock:
+            self._merge()
+            rows = np.sort(self.key_rows)
+            remap = {}
+            columns = [array.array(column.typecode) for column in (
+                self.starts, self.lengths, self.file_ids, self.pages, self.label_ids, self.meta_ids
+            )]
+            generation = int(self.text_name.split(".")[1]) + 1
+            text_name = f"text.{generation}.bin"
+            offset = 0
+            with open(self._file(text_name), "wb") as out:
+                for new_row, row in enumerate(rows.tolist()):
+                    out.write(self._text(row).encode())
+                    remap[row] = new_row
+                    length = self.lengths[row]
+                    for column, value in zip(columns, (
+                        offset, length, self.file_ids[row], self.pages[row],
+                        self.label_ids[row], self.meta_ids[row],
+                    )):
+                        column.append(value)
+                    offset += length
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+            self._writer.close()
+            self.text_name = text_name
+            (
+                self.starts, self.lengths, self.file_ids, self.pages, self.label_ids, self.meta_ids
+            ) = columns
+            self.key_rows = np.array([remap[row] for row in self.key_rows.tolist()], dtype=np.int64)
+            self._writer = open(self._file(text_name), "ab")
+            self._size = offset
+            self.dead_bytes = 0
+
+    def __getstate__(self):
+        self.flush()
+        return {"path": self.path, "merge_every": self.merge_every, "snapshot": self.snapshot}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["merge_every"], state.get("snapshot"))
+
+    # ------------------------------------------------------------------
+    # Docstore interface
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.keys) + len(self.pending)
+
+    def _row(self, doc_id: str) -> int | None:
+        row = self.pending.get(doc_id)
+        if row is not None:
+            return row
+        key = doc_id.encode()
+        i = int(np.searchsorted(self.keys, key))
+        if i < len(self.keys) and self.keys[i] == key:
+            return int(self.key_rows[i])
+        return None
+
+    def _intern(self, table: list, index: dict, value) -> int:
+        i = index.get(value)
+        if i is None:
+            i = index[value] = len(table)
+            table.append(value)
+        return i
+
+    def add(self, texts: dict[str, Document]) -> None:
+        with self._lock:
+            overlapping = [doc_id for doc_id in texts if self._row(doc_id) is not None]
+            if overlapping:
+                raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+            for doc_id, doc in texts.items():
+                data = doc.page_content.encode()
+                metadata = dict(doc.metadata)
+                file_id = page = label_id = -1
+                if isinstance(metadata.get("source"), str):
+                    file_id = self._intern(self.files, self._file_index, metadata.pop("source"))
+                if type(metadata.get("page")) is int and 0 <= metadata["page"] < 2**31:
+                    page = metadata.pop("page")
+                if isinstance(metadata.get("page_label"), str):
+                    label_id = self._intern(self.labels, self._label_index, metadata.pop("page_label"))
+                meta = json.dumps(metadata, sort_keys=True, default=str)
+                self.pending[doc_id] = len(self.starts)
+                self.starts.append(self._size)
+                self.lengths.append(len(data))
+                self.file_ids.append(file_id)
+                self.pages.append(page)
+                self.label_ids.append(label_id)
+                self.meta_ids.append(self._intern(self.metas, self._meta_index, meta))
+                self._writer.write(data)
+                self._size += len(data)
+            if len(self.pending) >= self.merge_every:
+                self._merge()
+
+    def delete(self, ids: list) -> None:
+        with self._lock:
+            self._merge()
+            rows = {doc_id: self._row(doc_id) for doc_id in ids}
+            found = [row for row in rows.values() if row is not None]
+            if not found:
+                raise ValueError(f"Tried to delete ids that does not exist: {ids}")
+            keep = ~np.isin(self.key_rows, np.array(found, dtype=np.int64))
+            self.keys, self.key_rows = self.keys[keep], self.key_rows[keep]
+            self.dead_bytes += sum(self.lengths[row] for row in found)
+
+    def search(self, search: str) -> str | Document:
+        with self._lock:
+            row = self._row(search)
+            if row is None:
+                return f"ID {search} not found."
+            text = self._text(row)
+            meta_id = self.meta_ids[row]
+            template = self._meta_dicts.get(meta_id)
+            if template is None:
+                template = self._meta_dicts[meta_id] = json.loads(self.metas[meta_id])
+            metadata = dict(template)
+            if self.file_ids[row] >= 0:
+                metadata["source"] = self.files[self.file_ids[row]]
+            if self.pages[row] >= 0:
+                metadata["page"] = self.pages[row]
+            if self.label_ids[row] >= 0:
+                metadata["page_label"] = self.labels[self.label_ids[row]]
+        return Document(id=search, page_content=text, metadata=metadata)
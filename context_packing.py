@@ -0,0 +1,103 @@
+from functools import lru_cache
+
+from langchain_core.documents import Document
+
+
+def token_counter(llm=None):
+    """Cached, approximate token counter for `llm`.
+
+    This is an estimate, not the served model's tokenizer: unless the model
+    sets `custom_get_token_ids`, LangChain's `get_num_tokens` counts with
+    the GPT-2 tokenizer (ChatOllama does not override it), whose counts
+    differ from llama3's larger vocabulary – leave headroom in the budget
+    rather than packing up to the model's context limit. Falls back to
+    ~4 characters per token when there is no model or `transformers` is
+    missing.
+    """
+    if llm is not None:
+        try:
+            llm.get_num_tokens("probe")
+            return lru_cache(maxsize=4096)(llm.get_num_tokens)
+        except Exception as e:
+            print(f"⚠️  GPT-2 tokenizer unavailable ({e}) – estimating 4 chars/token")
+    return lambda text: max(1, len(text) // 4)
+
+
+def merge_overlap(a: str, b: str, max_overlap: int, min_overlap: int = 20) -> str | None:
+    """Join `a` and `b` if b starts with a's tail (or one contains the other)."""
+    if b in a:
+        return a
+    if a in b:
+        return b
+    for k in range(min(len(a), len(b), max_overlap), min_overlap - 1, -1):
+        if a.endswith(b[:k]):
+            return a + b[k:]
+    return None
+
+
+def merge_page_chunks(texts: list[str], max_overlap: int) -> str:
+    """Merge one page's chunks: overlapping spans are kept once, the rest
+    are joined with an ellipsis line."""
+    texts = list(texts)
+    merged = True
+    while merged and len(texts) > 1:
+        merged = False
+        for i in range(len(texts)):
+            for j in range(len(texts)):
+                if i == j:
+                    continue
+                joined = merge_overlap(texts[i], texts[j], max_overlap)
+                if joined is not None:
+                    texts[i] = joined
+                    del texts[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return "\n…\n".join(texts)
+
+
+def pack_context(
+    docs: list[Document],
+    max_tokens: int,
+    count_tokens,
+    max_overlap: int = 200,
+    min_doc_tokens: int = 50,
+) -> tuple[list[Document], dict]:
+    """De-duplicate, merge and budget retrieved chunks before they are stuffed
+    into the prompt.
+
+    Chunks from the same source page are merged into one document (so the
+    splitter's overlap is sent once), documents keep the rank of their best
+    chunk, and they are added in rank order until `max_tokens` is reached;
+    the last one is truncated if at least `min_doc_tokens` still fit.
+
+    Returns the packed documents and {"tokens_before", "tokens_after",
+    "tokens_saved"}.
+    """
+    tokens_before = sum(count_tokens(doc.page_content) for doc in docs)
+
+    groups = {}  # (source, page) -> [docs], in rank order of first appearance
+    for doc in docs:
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        groups.setdefault(key, []).append(doc)
+
+    packed, used = [], 0
+    for group in groups.values():
+        text = merge_page_chunks([doc.page_content for doc in group], max_overlap)
+        tokens = count_tokens(text)
+        remaining = max_tokens - used
+        if tokens > remaining:
+            if remaining < min_doc_tokens:
+                break
+            text = text[: int(len(text) * remaining / tokens)]
+            tokens = count_tokens(text)
+        packed.append(Document(page_content=text, metadata=dict(group[0].metadata)))
+        used += tokens
+
+    stats = {
+        "tokens_before": tokens_before,
+        "tokens_after": used,
+        "tokens_saved": tokens_before - used,
+    }
+    return packed, stats
@@ -0,0 +1,115 @@
+from langchain_core.messages import (
+    AIMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+    convert_to_messages,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+
+
+class ConversationMemory:
+    """Token-bounded chat history for agent loops.
+
+    History is kept as a list of turns, each one user message followed by
+    everything the agent produced for it (AI messages, tool calls and their
+    tool results). A turn is only ever kept or dropped as a whole, so a tool
+    call never loses its tool result.
+
+    After every turn:
+
+    1. tool results older than the last `keep_recent_turns` turns are
+       compressed to short stubs – the final answers already carry what
+       the user saw;
+    2. while the history is over `max_tokens`, the oldest turn is evicted
+       and folded into a running summary, which is sent ahead of the
+       remaining turns.
+
+    The summary is extractive by default (no extra model call, so per-turn
+    latency stays flat). Pass a chat model as `summarizer` to have it
+    rewrite the summary instead.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 3000,
+        keep_recent_turns: int = 3,
+        tool_stub_chars: int = 120,
+        max_summary_tokens: int = 400,
+        summarizer=None,
+        token_counter=count_tokens_approximately,
+    ):
+        self.max_tokens = max_tokens
+        self.keep_recent_turns = keep_recent_turns
+        self.tool_stub_chars = tool_stub_chars
+        self.max_summary_tokens = max_summary_tokens
+        self.summarizer = summarizer
+        self.token_counter = token_counter
+        self.turns = []
+        self.summary_lines = []
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def messages(self) -> list:
+        """Messages to send to the agent for the next call."""
+        history = [m for turn in self.turns for m in turn]
+        if self.summary_lines:
+            summary = "Summary of the earlier conversation:\n" + "\n".join(self.summary_lines)
+            history.insert(0, SystemMessage(summary))
+        return history
+
+    def add_user_message(self, content: str):
+        self.turns.append([HumanMessage(content)])
+
+    def add_agent_messages(self, messages):
+        """Append what the agent produced for the current turn, then compact."""
+        self.turns[-1].extend(convert_to_messages(messages))
+        self._compact()
+
+    def token_count(self) -> int:
+        return self.token_counter(self.messages())
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+    def _stub(self, message: ToolMessage) -> ToolMessage:
+        text = str(message.content)
+        if len(text) <= self.tool_stub_chars:
+            return message
+        first_line = text.splitlines()[0][: self.tool_stub_chars]
+        return message.model_copy(update={"content": f"{first_line} … [truncated]"})
+
+    def _compact(self):
+        old_turns = self.turns[: -self.keep_recent_turns] if self.keep_recent_turns else self.turns
+        for turn in old_turns:
+            turn[:] = [self._stub(m) if isinstance(m, ToolMessage) else m for m in turn]
+
+        while len(self.turns) > 1 and self.token_count() > self.max_tokens:
+            self._summarise(self.turns.pop(0))
+
+    def _summarise(self, turn: list):
+        question = turn[0].content
+        answers = [
+            m.content for m in turn if isinstance(m, AIMessage) and m.content and not m.tool_calls
+        ]
+        answer = str(answers[-1]) if answers else "(no answer)"
+
+        if self.summarizer is not None:
+            previous = "\n".join(self.summary_lines)
+            reply = self.summarizer.invoke(
+                "Update this conversation summary with the new exchange. "
+                "Reply with at most five short bullet points.\n\n"
+                f"Summary so far:\n{previous or '(empty)'}\n\n"
+                f"User: {question}\nAssistant: {answer}"
+            )
+            self.summary_lines = str(reply.content).strip().splitlines()
+        else:
+            self.summary_lines.append(f"- User asked: {question[:80]} → Answer: {answer[:120]}")
+
+        while (
+            len(self.summary_lines) > 1
+            and self.token_counter([SystemMessage("\n".join(self.summary_lines))])
+            > self.max_summary_tokens
+        ):
+            self.summary_lines.pop(0)
@@ -2,58 +2,429 @@
 # 100 % LangChain 1.0 compliant RAG chat-bot
 # --------------------------------------------------
 from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_ollama import OllamaEmbeddings, ChatOllama  # 1.0 partner package
-from langchain_community.vectorstores import FAISS
 from langchain.chains.retrieval import create_retrieval_chain  # FIXED IMPORT
 from langchain.chains.combine_documents import create_stuff_documents_chain  # FIXED IMPORT
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.chat_models import init_chat_model  # 1.0 helper (optional but future-proof)
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableLambda, RunnableParallel, RunnablePassthrough
+from answer_cache import SemanticAnswerCache
+from chunk_store import ChunkStore
+from context_packing import pack_context, token_counter
+from embedding_pipeline import BatchedEmbeddings
+from fast_splitter import FastSplitter
+from hybrid_retrieval import BM25Index, HybridRetriever
+from reranking import CrossEncoderReranker
+from tracing import Tracer, TracingCallbackHandler
+from vector_index import (
+    DeletableFAISS,
+    IndexConfig,
+    apply_search_params,
+    compact_index,
+    delete_ids,
+    ensure_index,
+)
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+import asyncio
+import glob
+import hashlib
+import json
 import os
+import shutil
+import sys
+import time
+
+
+def make_splitter(chunk_size: int, chunk_overlap: int, length_unit: str = "chars"):
+    # same chunks as RecursiveCharacterTextSplitter(..., length_function=len)
+    # in "chars" mode, computed on offsets (see fast_splitter.py)
+    return FastSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_unit=length_unit
+    )
+
+
+def load_and_split(path: str, chunk_size: int, chunk_overlap: int, length_unit: str = "chars"):
+    """Parse and chunk one PDF – module level so a process pool can pickle it."""
+    pages = PyPDFLoader(path).lazy_load()
+    splitter = make_splitter(chunk_size, chunk_overlap, length_unit)
+    return [chunk for page in pages for chunk in splitter.split_documents([page])]
 
 
 class DocumentQAChatbot:
-    def __init__(self, pdf_path: str):
+    def __init__(
+        self,
+        pdf_path: str,
+        index_dir: str = ".faiss_cache",
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        length_unit: str = "chars",
+        embedding_model: str = "llama3.1:8b",
+        embed_batch_size: int = 32,
+        embed_concurrency: int = 4,
+        max_workers: int | None = None,
+        cache_threshold: float | None = None,
+        index_config: IndexConfig | None = None,
+        hybrid: bool = True,
+        context_tokens: int = 1500,
+        tracer: Tracer | None = None,
+        reranker: CrossEncoderReranker | None = None,
+        compact_docstore: bool = True,
+    ):
+        # `pdf_path` may be a single PDF or a directory searched recursively
         self.pdf_path = pdf_path
+        self.index_dir = index_dir
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.length_unit = length_unit  # "chars", or "tokens" for token-sized chunks
+        self.embedding_model = embedding_model
+        self.embed_batch_size = embed_batch_size
+        self.embed_concurrency = embed_concurrency
+        self.max_workers = max_workers  # parser processes, None = one per core
+        # cosine similarity for reusing a cached answer; None (default)
+        # disables the cache – calibrate it for the embedding model first
+        self.cache_threshold = cache_threshold
+        self.index_config = index_config or IndexConfig()
+        # BM25 over the same chunks, fused with FAISS results at query time
+        self.bm25 = BM25Index() if hybrid else None
+        self.context_tokens = context_tokens  # prompt budget for retrieved context
+        self.count_tokens = None
+        self.last_pack_stats = None
+        # per-stage spans (embed_query, search, retrieve, pack, prompt, ttft, generation)
+        self.tracer = tracer
+        self.trace_handler = TracingCallbackHandler(tracer) if tracer else None
+        # optional cross-encoder pass over reranker.fetch_k retrieved chunks
+        self.reranker = reranker
+        # chunk text on disk (memory-mapped) instead of Documents in RAM
+        self.compact_docstore = compact_docstore
         self.vectorstore = None
+        self.manifest = {"files": {}}
+        self.answer_cache = None
         self.qa_chain = None
+        self.last_ttft = None  # seconds to first streamed token of the last answer
+
+    # ------------------------------------------------------------------
+    # 0.  On-disk index cache
+    # ------------------------------------------------------------------
+    def cache_key(self) -> str:
+        """Hash of the PDF/corpus path, splitter parameters, embedding model
+        and index layout.
+
+        The PDF bytes are deliberately left out: edited files keep their
+        index directory and are re-indexed incrementally (see
+        `index_files`), while a different splitter or model gets a fresh
+        index.
+        """
+        digest = hashlib.sha256()
+        digest.update(
+            f"{os.path.abspath(self.pdf_path)}|{self.chunk_size}|"
+            f"{self.chunk_overlap}|{self.length_unit}|{self.embedding_model}|"
+            f"{self.index_config.key()}".encode()
+        )
+        return digest.hexdigest()
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def pdf_files(self) -> list[str]:
+        if os.path.isdir(self.pdf_path):
+            pattern = os.path.join(self.pdf_path, "**", "*.pdf")
+            return sorted(glob.glob(pattern, recursive=True))
+        return [self.pdf_path]
+
+    def changed_files(self) -> tuple[list[str], list[str]]:
+        """Return (new or edited files, files removed since the last build).
+
+        Size and mtime are checked first so an unchanged corpus of thousands
+        of PDFs does not have to be re-hashed on every start. Files that
+        were only touched (same hash) get their new mtime saved right away,
+        so they are not hashed again next time either.
+        """
+        indexed = self.manifest["files"]
+        changed, touched = [], 0
+        paths = self.pdf_files()
+        for path in paths:
+            stat = os.stat(path)
+            entry = indexed.get(path)
+            if entry and (entry["size"], entry["mtime"]) == (stat.st_size, stat.st_mtime):
+                continue
+            if entry and entry["sha256"] == self.file_hash(path):
+                entry["mtime"] = stat.st_mtime  # touched, not edited
+                touched += 1
+                continue
+            changed.append(path)
+        removed = sorted(set(indexed) - set(paths))
+        if touched and os.path.isdir(self.index_path()):
+            self.save_manifest()
+        return changed, removed
+
+    def save_manifest(self):
+        """Rewrite only the cached index's manifest.json, atomically."""
+        path = os.path.join(self.index_path(), "manifest.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(path + ".tmp", path)
+
+    def index_path(self) -> str:
+        return os.path.join(self.index_dir, self.cache_key())
+
+    def chunk_store_path(self) -> str:
+        # beside the index directory, which is swapped out on every save;
+        # the pickled docstore in index.pkl refers to it by path
+        return self.index_path() + ".chunks"
+
+    def get_embeddings(self):
+        return BatchedEmbeddings(
+            OllamaEmbeddings(
+                model=self.embedding_model, base_url="http://localhost:11434"
+            ),
+            batch_size=self.embed_batch_size,
+            max_concurrency=self.embed_concurrency,
+        )
+
+    @staticmethod
+    def chunk_id(chunk, seen: dict) -> str:
+        """Content-addressed chunk id: sha256 of source file, page and text.
+
+        Identical chunks on the same page get a `-n` suffix (tracked in
+        `seen`) so every id stays unique while unchanged chunks keep their
+        id across edits.
+        """
+        digest = hashlib.sha256(
+            f"{chunk.metadata.get('source')}\0{chunk.metadata.get('page')}\0"
+            f"{chunk.page_content}".encode()
+        ).hexdigest()
+        n = seen.get(digest, 0)
+        seen[digest] = n + 1
+        return digest if n == 0 else f"{digest}-{n}"
+
+    def load_cached_vectorstore(self) -> bool:
+        path = self.index_path()
+        if not os.path.isfile(os.path.join(path, "index.faiss")):
+            return False
+        print(f"📦 Loading cached vector store: {path}")
+        self.vectorstore = DeletableFAISS.load_local(
+            path, self.get_embeddings(), allow_dangerous_deserialization=True
+        )
+        apply_search_params(self.vectorstore, self.index_config)
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        if self.bm25 is not None:
+            bm25_path = os.path.join(path, "bm25.npz")
+            if os.path.isfile(bm25_path):
+                self.bm25 = BM25Index.load(bm25_path)
+            else:  # index built with hybrid=False – rebuild from the docstore
+                for doc_id in self.vectorstore.live_ids():
+                    self.bm25.add(doc_id, self.vectorstore.docstore.search(doc_id).page_content)
+        print(f"✅ Loaded {self.vectorstore.index.ntotal} vectors (no embedding calls)")
+        if self.vectorstore.tombstones:
+            print(
+                f"🪦 {len(self.vectorstore.tombstones)} deleted vectors still in the graph"
+                " – run with --compact to drop them"
+            )
+        return True
+
+    def save_vectorstore(self):
+        path = self.index_path()
+        tmp_path = path + ".tmp"
+        # write next to the final location, then swap in, so a crash never
+        # leaves a half-written index that looks valid
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        self.vectorstore.save_local(tmp_path)
+        version = hashlib.sha256()
+        for name, entry in sorted(self.manifest["files"].items()):
+            version.update(name.encode())
+            version.update("".join(entry["chunk_ids"]).encode())
+        self.manifest["version"] = version.hexdigest()
+        with open(os.path.join(tmp_path, "manifest.json"), "w") as f:
+            json.dump(self.manifest, f)
+        if self.bm25 is not None:
+            self.bm25.save(os.path.join(tmp_path, "bm25.npz"))
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        if isinstance(self.vectorstore.docstore, ChunkStore):
+            # only now is the previous index, and the snapshot it names, gone
+            self.vectorstore.docstore.prune()
+        print(f"💾 Vector store cached at {path}")
 
     # ------------------------------------------------------------------
     # 1.  Load PDF
     # ------------------------------------------------------------------
-    def load_document(self):
-        print(f"📄 Loading document: {self.pdf_path}")
-        documents = PyPDFLoader(self.pdf_path).load()
+    def load_document(self, path: str):
+        print(f"📄 Loading document: {path}")
+        documents = PyPDFLoader(path).load()
         print(f"✅ Loaded {len(documents)} pages")
         return documents
 
+    def iter_pages(self, path: str):
+        """Yield pages one at a time instead of parsing the whole PDF up front."""
+        print(f"📄 Streaming document: {path}")
+        yield from PyPDFLoader(path).lazy_load()
+
     # ------------------------------------------------------------------
     # 2.  Chunk
     # ------------------------------------------------------------------
+    def get_splitter(self):
+        return make_splitter(self.chunk_size, self.chunk_overlap, self.length_unit)
+
     def split_documents(self, documents):
         print("✂️  Splitting document into chunks…")
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000, chunk_overlap=200, length_function=len
-        )
-        chunks = splitter.split_documents(documents)
+        chunks = self.get_splitter().split_documents(documents)
         print(f"✅ Created {len(chunks)} chunks")
         return chunks
 
+    def iter_chunks(self, pages):
+        """Split page by page – yields the same chunks as `split_documents`."""
+        splitter = self.get_splitter()
+        for page in pages:
+            yield from splitter.split_documents([page])
+
+    def iter_file_chunks(self, paths: list[str], streaming: bool = True):
+        """Yield (path, chunks) per file.
+
+        Several files are parsed and chunked in a process pool, one file per
+        task, while this process embeds the results in order. At most two
+        files per worker are in flight: parsing outpaces embedding, so
+        submitting the whole corpus up front would park every parsed file
+        in memory until the embedder reaches it. A single file is parsed
+        in-process, lazily when `streaming` is set.
+        """
+        if len(paths) > 1 and self.max_workers != 1:
+            print(f"🧵 Parsing {len(paths)} PDFs in a process pool…")
+            split_args = (self.chunk_size, self.chunk_overlap, self.length_unit)
+            window = 2 * (self.max_workers or os.cpu_count() or 1)
+            pending = iter(paths)
+            in_flight = deque()
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                for path in islice(pending, window):
+                    in_flight.append((path, pool.submit(load_and_split, path, *split_args)))
+                while in_flight:
+                    path, future = in_flight.popleft()
+                    chunks = future.result()
+                    for next_path in islice(pending, 1):
+                        in_flight.append(
+                            (next_path, pool.submit(load_and_split, next_path, *split_args))
+                        )
+                    yield path, chunks
+                    del chunks
+        else:
+            for path in paths:
+                if streaming:
+                    yield path, self.iter_chunks(self.iter_pages(path))
+                else:
+                    yield path, self.split_documents(self.load_document(path))
+
     # ------------------------------------------------------------------
     # 3.  Embed → FAISS
     # ------------------------------------------------------------------
+    def index_files(self, file_chunks, removed=(), batch_size: int = 256):
+        """Feed per-file chunks into the store in batches.
+
+        `file_chunks` yields (path, chunks) pairs; `chunks` may be a list or
+        a generator. Chunks whose id the file already had indexed are
+        skipped, the file's ids that no longer occur are deleted, and every
+        id of a `removed` file is deleted – so this handles both a cold
+        build and an incremental re-index. Only one batch of chunks is held
+        in memory at a time.
+        """
+        files = self.manifest["files"]
+        batch, stale = [], []
+        added = 0
+
+        def flush():
+            nonlocal added
+            texts = [chunk.page_content for chunk, _ in batch]
+            metadatas = [chunk.metadata for chunk, _ in batch]
+            batch_ids = [chunk_id for _, chunk_id in batch]
+            if self.vectorstore is None:
+                embeddings = self.get_embeddings()
+            else:
+                embeddings = self.vectorstore.embedding_function
+            # only the embedding call is blamed on Ollama – index errors
+            # (e.g. faiss training) surface with their own traceback
+            try:
+                vectors = embeddings.embed_documents(texts)
+            except Exception as e:
+                print(f"❌ Embedding error: {e}")
+                print(f"   → Is Ollama running and is {self.embedding_model} pulled?")
+                exit(1)
+            pairs = list(zip(texts, vectors))
+            if self.vectorstore is None:
+                store = {}
+                if self.compact_docstore:
+                    # a previous index points into the store being replaced
+                    shutil.rmtree(self.index_path(), ignore_errors=True)
+                    store["docstore"] = ChunkStore.create(self.chunk_store_path())
+                self.vectorstore = DeletableFAISS.from_embeddings(
+                    pairs, embeddings, metadatas=metadatas, ids=batch_ids, **store
+                )
+            else:
+                self.vectorstore.add_embeddings(pairs, metadatas=metadatas, ids=batch_ids)
+            if self.bm25 is not None:
+                for chunk, chunk_id in batch:
+                    self.bm25.add(chunk_id, chunk.page_content)
+            if ensure_index(self.vectorstore, self.index_config):
+                print(f"✅ Switched to a {self.index_config.kind} index")
+            added += len(batch)
+            batch.clear()
+            print(f"   … {added} chunks embedded")
+
+        for path, chunks in file_chunks:
+            indexed = set(files.get(path, {}).get("chunk_ids", []))
+            ids, seen = [], {}
+            for chunk in chunks:
+                chunk_id = self.chunk_id(chunk, seen)
+                ids.append(chunk_id)
+                if chunk_id not in indexed:
+                    batch.append((chunk, chunk_id))
+                    if len(batch) >= batch_size:
+                        flush()
+            stale.extend(indexed - set(ids))
+            stat = os.stat(path)
+            files[path] = {
+                "sha256": self.file_hash(path),
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "chunk_ids": ids,
+            }
+        if batch:
+            flush()
+
+        for path in removed:
+            stale.extend(files.pop(path)["chunk_ids"])
+        if self.vectorstore is None:
+            print("❌ No text could be extracted from the documents")
+            exit(1)
+        if stale:
+            if self.bm25 is not None:
+                for doc_id in stale:
+                    self.bm25.remove(doc_id)
+            delete_ids(self.vectorstore, stale)
+        print(f"✅ {added} chunks embedded, {len(stale)} stale chunks removed")
+        self.save_vectorstore()
+
+    def compact_index(self):
+        """Rebuild the index without deleted vectors (HNSW tombstones)."""
+        dropped = compact_index(self.vectorstore)
+        if dropped:
+            print(f"🧹 Compacted the index – dropped {dropped} deleted vectors")
+            self.save_vectorstore()
+
     def create_vectorstore(self, chunks):
         print("🔮 Creating embeddings and vector store…")
-        embeddings = OllamaEmbeddings(
-            model="llama3.1:8b", base_url="http://localhost:11434"
-        )
-        try:
-            self.vectorstore = FAISS.from_documents(chunks, embeddings)
-            print("✅ Vector store ready")
-        except Exception as e:
-            print(f"❌ Embedding error: {e}")
-            print("   → Is Ollama running and is llama3.1:8b pulled?")
-            exit(1)
+        self.vectorstore = None
+        self.manifest = {"files": {}}
+        if self.bm25 is not None:
+            self.bm25 = BM25Index()
+        self.index_files([(self.pdf_path, chunks)])
 
     # ------------------------------------------------------------------
     # 4.  Build 1.0 LCEL chain
@@ -82,20 +453,79 @@ class DocumentQAChatbot:
 
         # --- Chains ---
         combine_docs_chain = create_stuff_documents_chain(llm, prompt)
-        retriever = self.vectorstore.as_retriever(search_kwargs={"k": 3})
+        # over-fetch when a reranker picks the final 3
+        k = self.reranker.fetch_k if self.reranker else 3
+        # BM25 fused in when hybrid; times embed_query and search on its own
+        retriever = HybridRetriever(
+            vectorstore=self.vectorstore, bm25=self.bm25, k=k, tracer=self.tracer
+        )
+        if self.reranker:
+            self.reranker.model()  # load it now rather than on the first question
+            retriever = RunnableParallel(
+                query=RunnablePassthrough(), docs=retriever
+            ) | RunnableLambda(self.rerank_documents)
+        # merge overlapping chunks and fit them to the token budget; a
+        # non-retriever runnable receives the whole chain input, hence the
+        # leading lambda picking the question
+        self.count_tokens = token_counter(llm)
+        retriever = (
+            RunnableLambda(lambda inputs: inputs["input"])
+            | retriever
+            | RunnableLambda(self.pack_documents)
+        )
         self.qa_chain = create_retrieval_chain(retriever, combine_docs_chain)
         print("✅ QA chain ready")
 
+    def rerank_documents(self, inputs):
+        with self.span("rerank") as attrs:
+            docs = self.reranker.rerank(inputs["query"], inputs["docs"])
+            if self.reranker.last_stats:
+                attrs["scored"] = self.reranker.last_stats["scored"]
+        return docs
+
+    def pack_documents(self, docs):
+        with self.span("pack") as attrs:
+            packed, self.last_pack_stats = pack_context(
+                docs, self.context_tokens, self.count_tokens, max_overlap=self.chunk_overlap
+            )
+            attrs["context_tokens"] = self.last_pack_stats["tokens_after"]
+        return packed
+
+    def span(self, name: str):
+        return self.tracer.span(name) if self.tracer else nullcontext({})
+
+    def chain_config(self) -> dict:
+        return {"callbacks": [self.trace_handler]} if self.trace_handler else {}
+
+    def print_pack_stats(self):
+        stats = self.last_pack_stats
+        if stats:
+            print(
+                f"🧮 Context: {stats['tokens_after']} tokens "
+                f"(saved {stats['tokens_saved']} of {stats['tokens_before']})"
+            )
+
     # ------------------------------------------------------------------
     # 5.  One-shot initialisation
     # ------------------------------------------------------------------
-    def initialize(self):
+    def initialize(self, streaming: bool = True):
         print("\n" + "=" * 60)
         print("🤖 Initialising Document Q&A Chat-bot (LangChain 1.0)")
         print("=" * 60 + "\n")
-        docs = self.load_document()
-        chunks = self.split_documents(docs)
-        self.create_vectorstore(chunks)
+        cached = self.load_cached_vectorstore()
+        changed, removed = self.changed_files()
+        if cached and (changed or removed):
+            print(f"📝 {len(changed)} changed and {len(removed)} removed PDFs since the last build")
+        if changed or removed:
+            # lazy pages → lazy chunks → batched embedding: the first vectors
+            # land after one batch and memory stays flat
+            self.index_files(self.iter_file_chunks(changed, streaming), removed)
+        if self.cache_threshold is not None:
+            self.answer_cache = SemanticAnswerCache(
+                os.path.join(self.index_dir, self.cache_key() + ".answers.npz"),
+                threshold=self.cache_threshold,
+            )
+            self.answer_cache.bind(self.manifest["version"])
         self.setup_qa_chain()
         print("\n" + "=" * 60)
         print("✅ Chat-bot ready – ask your questions!")
@@ -109,20 +539,133 @@ class DocumentQAChatbot:
             raise RuntimeError("Chat-bot not initialised. Run .initialize() first.")
 
         print(f"\n🤔 Question: {question}\n💭 Thinking…\n")
-        response = self.qa_chain.invoke({"input": question})
-        answer = response.get("answer", "No answer found.")
-        sources = response.get("context", [])
+        with self.span("ask"):
+            cached, embedding = self.cache_lookup(question)
+            if cached:
+                answer, sources = cached
+            else:
+                response = self.qa_chain.invoke({"input": question}, config=self.chain_config())
+                answer = response.get("answer", "No answer found.")
+                sources = response.get("context", [])
+                self.cache_store(question, embedding, answer, sources)
+                self.print_pack_stats()
 
         print("💡 Answer:", answer)
-        if sources:
-            pages = {doc.metadata.get("page", "unknown") for doc in sources}
-            print(f"📚 Sources: {len(sources)} chunks  |  Pages: {sorted(pages)}")
+        self.print_sources(sources)
         return answer
 
+    def ask_stream(self, question: str):
+        """Like `ask`, but prints tokens as they are generated.
+
+        Sources are printed as soon as retrieval finishes, before the first
+        token, and time-to-first-token is kept in `self.last_ttft`.
+        """
+        if not self.qa_chain:
+            raise RuntimeError("Chat-bot not initialised. Run .initialize() first.")
+
+        print(f"\n🤔 Question: {question}\n💭 Thinking…\n")
+        with self.span("ask"):
+            start = time.perf_counter()
+            cached, embedding = self.cache_lookup(question)
+            if cached:
+                answer, sources = cached
+                self.print_sources(sources)
+                print("💡 Answer:", answer)
+                self.last_ttft = time.perf_counter() - start
+                return answer
+
+            parts, sources, ttft = [], [], None
+            for chunk in self.qa_chain.stream({"input": question}, config=self.chain_config()):
+                if "context" in chunk:
+                    sources = chunk["context"]
+                    self.print_sources(sources)
+                    self.print_pack_stats()
+                token = chunk.get("answer")
+                if token:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                        print("💡 Answer: ", end="", flush=True)
+                    parts.append(token)
+                    print(token, end="", flush=True)
+            total = time.perf_counter() - start
+            answer = "".join(parts) or "No answer found."
+            self.last_ttft = ttft
+            print(f"\n⏱️  First token: {ttft or total:.2f}s  |  Total: {total:.2f}s")
+            self.cache_store(question, embedding, answer, sources)
+            return answer
+
+    async def aask(self, question: str) -> dict:
+        """Non-blocking `ask` for the server: no console output, returns
+        {"answer": …, "sources": {file: pages}}."""
+        if not self.qa_chain:
+            raise RuntimeError("Chat-bot not initialised. Run .initialize() first.")
+
+        with self.span("ask"):
+            embedding = None
+            if self.answer_cache:
+                with self.span("embed_query"):
+                    embedding = await self.vectorstore.embeddings.aembed_query(question)
+            cached, embedding = self.cache_lookup(question, embedding)
+            if cached:
+                answer, sources = cached
+            else:
+                response = await self.qa_chain.ainvoke({"input": question}, config=self.chain_config())
+                answer = response.get("answer", "No answer found.")
+                sources = response.get("context", [])
+                self.cache_store(question, embedding, answer, sources)
+        return {"answer": answer, "sources": self.source_pages(sources)}
+
+    def cache_lookup(self, question: str, embedding=None):
+        """Return ((answer, sources) or None, question embedding)."""
+        if not self.answer_cache:
+            return None, None
+        if embedding is None:
+            with self.span("embed_query"):
+                embedding = self.vectorstore.embeddings.embed_query(question)
+        with self.span("cache_lookup"):
+            cached = self.answer_cache.lookup(embedding)
+        if not cached:
+            return None, embedding
+        print(f"⚡ Cached answer (matched: {cached['question']!r})")
+        sources = [Document(**doc) for doc in cached["sources"]]
+        return (cached["answer"], sources), embedding
+
+    def cache_store(self, question: str, embedding, answer: str, sources):
+        if not self.answer_cache:
+            return
+        self.answer_cache.store(
+            question,
+            embedding,
+            answer,
+            [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in sources],
+        )
+
+    def print_sources(self, sources):
+        if sources:
+            print(f"📚 Sources: {len(sources)} chunks")
+            for name, pages in self.source_pages(sources).items():
+                print(f"   • {name}  |  Pages: {pages}")
+
+    def source_pages(self, sources) -> dict[str, list]:
+        """Group retrieved chunks into {file name: sorted page list}.
+
+        With a directory corpus the name is the path relative to it, so
+        a/manual.pdf and b/manual.pdf stay apart.
+        """
+        by_file = {}
+        for doc in sources:
+            source = doc.metadata.get("source", "unknown")
+            if os.path.isdir(self.pdf_path) and source != "unknown":
+                name = os.path.relpath(source, self.pdf_path)
+            else:
+                name = os.path.basename(source)
+            by_file.setdefault(name, set()).add(doc.metadata.get("page", "unknown"))
+        return {name: sorted(pages, key=str) for name, pages in sorted(by_file.items())}
+
     # ------------------------------------------------------------------
     # 7.  Interactive loop
     # ------------------------------------------------------------------
-    def chat(self):
+    def chat(self, stream: bool = True):
         print("\n💬 Chat mode  –  type 'exit'/'q' to quit")
         print("-" * 60)
         while True:
@@ -133,20 +676,97 @@ class DocumentQAChatbot:
             if not question:
                 continue
             try:
-                self.ask(question)
+                if stream:
+                    self.ask_stream(question)
+                else:
+                    self.ask(question)
             except Exception as e:
                 print(f"❌ Error: {e}")
 
 
+# ----------------------------------------------------------------------
+# Async server mode
+# ----------------------------------------------------------------------
+class AsyncQAServer:
+    """Serve one initialised bot to many clients over TCP.
+
+    Protocol: newline-delimited JSON, `{"question": "…"}` in and
+    `{"answer": "…", "sources": {...}}` (or `{"error": "…"}`) out.
+    All clients share the bot's vector store and LLM client; at most
+    `max_concurrency` questions run against Ollama at once and identical
+    questions waiting in the queue are coalesced into a single chain call.
+    """
+
+    def __init__(
+        self,
+        bot: DocumentQAChatbot,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        max_concurrency: int = 4,
+    ):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.max_concurrency = max_concurrency
+        self.semaphore = None
+        self.inflight: dict[str, asyncio.Task] = {}
+
+    async def answer(self, question: str) -> dict:
+        key = " ".join(question.lower().split())
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._answer(question))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        # shield: one client disconnecting must not cancel the shared call
+        return await asyncio.shield(task)
+
+    async def _answer(self, question: str) -> dict:
+        async with self.semaphore:
+            return await self.bot.aask(question)
+
+    async def handle(self, reader, writer):
+        while line := await reader.readline():
+            try:
+                reply = await self.answer(json.loads(line)["question"])
+            except Exception as e:
+                reply = {"error": str(e)}
+            writer.write((json.dumps(reply) + "\n").encode())
+            await writer.drain()
+        writer.close()
+
+    async def serve(self):
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        print(f"🌐 Serving on {self.host}:{self.port} (max {self.max_concurrency} concurrent)")
+        async with server:
+            await server.serve_forever()
+
+
 # ----------------------------------------------------------------------
 # Run only when executed directly
 # ----------------------------------------------------------------------
-if __name__ == "__main__":
-    PDF_PATH = "your_document.pdf"  # <— change to your file
-    if not os.path.isfile(PDF_PATH):
+if __name__ == "__main__":  # guard also required by the parser process pool
+    PDF_PATH = "your_document.pdf"  # <— change to your file or a folder of PDFs
+    if not os.path.exists(PDF_PATH):
         print(f"❌ File not found: {PDF_PATH}")
         exit(1)
 
-    bot = DocumentQAChatbot(PDF_PATH)
+    tracer = Tracer(jsonl_path="traces.jsonl")
+    # --rerank: over-fetch and let a local cross-encoder pick the top 3
+    reranker = CrossEncoderReranker() if "--rerank" in sys.argv else None
+    # --answer-cache: reuse answers for near-identical questions
+    cache_threshold = 0.95 if "--answer-cache" in sys.argv else None
+    bot = DocumentQAChatbot(
+        PDF_PATH, tracer=tracer, reranker=reranker, cache_threshold=cache_threshold
+    )
     bot.initialize()
-    bot.chat()
\ No newline at end of file
+    if "--compact" in sys.argv:
+        bot.compact_index()
+    if "--serve" in sys.argv:
+        tracer.serve()  # Prometheus scrape endpoint next to the Q&A server
+        asyncio.run(AsyncQAServer(bot).serve())
+    else:
+        bot.chat()
+        tracer.flush()
+        tracer.print_summary()
\ No newline at end of file
@@ -7,23 +7,23 @@ from langchain.agents import create_agent
 from langchain.agents.middleware import ModelRequest, ModelResponse,wrap_model_call
 from langchain.messages import HumanMessage, AIMessage, SystemMessage
 
+from model_router import ModelRouter, ModelTier
+
 load_dotenv()
 
-basic_model = init_chat_model('gemini-2.5-flash'),
+basic_model = init_chat_model('gemini-2.5-flash')
 advanced_model = init_chat_model('gemini-2.5-pro')
 
-@wrap_model_call
-def dynamic_model_selection(request: ModelRequest, handler) -> ModelResponse:
-    message_count = len(request.state['messages'])
-
-    if message_count > 3:
-        model = advanced_model
-    else:
-        model = basic_model
-
-    request.model = model
-
-    return handler(request)
+# Cheapest model that meets the SLO wins; flash only takes simple requests
+# and pro takes over when flash is too slow or failing.
+dynamic_model_selection = ModelRouter(
+    tiers=[
+        ModelTier('gemini-2.5-flash', basic_model, cost=1, max_complexity=3),
+        ModelTier('gemini-2.5-pro', advanced_model, cost=8),
+    ],
+    latency_slo=8.0,
+    metrics_path='routing_metrics.jsonl',
+)
 
 agent = create_agent(model=basic_model, middleware=[dynamic_model_selection])
 
@@ -34,4 +34,5 @@ response = agent.invoke({
     ]
 })
 
-print(response["messages"][-1].content)
\ No newline at end of file
+print(response["messages"][-1].content)
+print(dynamic_model_selection.metrics())
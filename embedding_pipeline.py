@@ -0,0 +1,113 @@
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+
+class BatchedEmbeddings(Embeddings):
+    """Wrap any LangChain embeddings client with batched, concurrent calls.
+
+    Texts are grouped into `batch_size` batches and up to `max_concurrency`
+    batches are in flight at once, so the embedding server always has the
+    next request queued instead of idling between round trips. For a local
+    Ollama server, set OLLAMA_NUM_PARALLEL >= max_concurrency so requests
+    are actually served in parallel.
+
+    Failed batches are retried with exponential backoff (`backoff`,
+    2 * `backoff`, 4 * `backoff`, … seconds).
+
+    Query embeddings are kept in an LRU cache of `query_cache_size`
+    entries, so a question embedded for the answer cache is not embedded
+    again by the retriever, and `embed_queries` embeds several queries in a
+    single round trip.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: int = 32,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        query_cache_size: int = 1024,
+    ):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.last_throughput = 0.0  # chunks / second of the last embed_documents call
+        self.query_cache_size = query_cache_size
+        self._query_cache = OrderedDict()
+        self._query_lock = threading.Lock()
+
+    def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.embeddings.embed_documents(batch)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff * 2**attempt
+                print(f"⚠️  Embedding batch failed ({e}) – retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        batches = [
+            texts[i : i + self.batch_size] for i in range(0, len(texts), self.batch_size)
+        ]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            # map() keeps batch order, so vectors line up with the input texts
+            results = list(pool.map(self._embed_batch, batches))
+        elapsed = time.perf_counter() - start
+        self.last_throughput = len(texts) / elapsed if elapsed > 0 else float("inf")
+        print(
+            f"⚡ Embedded {len(texts)} chunks in {elapsed:.1f}s "
+            f"({self.last_throughput:.1f} chunks/s, {len(batches)} batches)"
+        )
+        return [vector for batch in results for vector in batch]
+
+    def _cached_query(self, text: str):
+        with self._query_lock:
+            vector = self._query_cache.get(text)
+            if vector is not None:
+                self._query_cache.move_to_end(text)
+            return vector
+
+    def _remember_query(self, text: str, vector: list[float]):
+        with self._query_lock:
+            self._query_cache[text] = vector
+            self._query_cache.move_to_end(text)
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+
+    def embed_query(self, text: str) -> list[float]:
+        vector = self._cached_query(text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._remember_query(text, vector)
+        return vector
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed several queries; cache misses go out in one batched call."""
+        vectors = {text: self._cached_query(text) for text in texts}
+        missing = [text for text, vector in vectors.items() if vector is None]
+        if len(missing) == 1:
+            vectors[missing[0]] = self.embed_query(missing[0])
+        elif missing:
+            embed = self.embeddings.embed_documents
+            # Gemini embeds documents and queries with different task types
+            if "task_type" in inspect.signature(embed).parameters:
+                fresh = embed(missing, task_type="RETRIEVAL_QUERY")
+            else:
+                fresh = embed(missing)
+            for text, vector in zip(missing, fresh):
+                self._remember_query(text, vector)
+                vectors[text] = vector
+        return [vectors[text] for text in texts]
@@ -0,0 +1,175 @@
+import copy
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from langchain_core.documents import Document
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+@lru_cache(maxsize=None)
+def _encoding(name: str):
+    import tiktoken
+
+    return tiktoken.get_encoding(name)
+
+
+@lru_cache(maxsize=65536)
+def token_length(text: str, encoding: str = "cl100k_base") -> int:
+    """Token count with a cached tokenizer and a cache of recent pieces."""
+    return len(_encoding(encoding).encode(text))
+
+
+class FastSplitter:
+    """Drop-in for `RecursiveCharacterTextSplitter(chunk_size, chunk_overlap,
+    length_function=len)` that works on offsets instead of string copies.
+
+    It runs the same recursive algorithm – same separators, separators kept
+    at the start of each piece, same merge/overlap rules, whitespace
+    stripped – so in the default "chars" mode it yields byte-identical
+    chunks (bench_splitter.py checks this). Pieces are (start, end) spans
+    into the page text found with `str.find`; the only strings built are
+    the final chunks, each one slice of the page.
+
+    `length_unit="tokens"` measures pieces with a cached tiktoken tokenizer
+    instead, so `chunk_size` / `chunk_overlap` are in tokens.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        length_unit: str = "chars",
+        separators: list[str] | None = None,
+        encoding: str = "cl100k_base",
+    ):
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size})"
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.length_unit = length_unit
+        self.separators = separators or DEFAULT_SEPARATORS
+        self.encoding = encoding
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def split_text(self, text: str) -> list[str]:
+        if self.length_unit == "chars":
+            if len(text) < self.chunk_size:
+                # every piece fits and their lengths add up to len(text), so
+                # the recursive splitter would merge them back into one chunk
+                chunk = text.strip()
+                return [chunk] if chunk else []
+            length = lambda start, end: end - start
+        else:
+            length = lambda start, end: token_length(text[start:end], self.encoding)
+        chunks = []
+        self._split(text, 0, len(text), self.separators, length, chunks)
+        return chunks
+
+    def split_documents(self, documents) -> list[Document]:
+        chunks = []
+        for doc in documents:
+            metadata = doc.metadata
+            # loader metadata is flat scalars – a dict copy is as good as a deepcopy
+            flat = all(isinstance(v, (str, int, float, bool, type(None))) for v in metadata.values())
+            for chunk in self.split_text(doc.page_content):
+                chunks.append(
+                    Document.model_construct(
+                        page_content=chunk,
+                        metadata=dict(metadata) if flat else copy.deepcopy(metadata),
+                    )
+                )
+        return chunks
+
+    # ------------------------------------------------------------------
+    # Recursive splitting on spans
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _pieces(text: str, start: int, end: int, separator: str) -> list[tuple[int, int]]:
+        """Spans of text[start:end] cut before each separator occurrence."""
+        if not separator:
+            return [(i, i + 1) for i in range(start, end)]
+        cuts = []
+        position = text.find(separator, start, end)
+        while position != -1:
+            cuts.append(position)
+            position = text.find(separator, position + len(separator), end)
+        bounds = [start] + cuts + [end]
+        return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+    def _split(self, text, start, end, separators, length, chunks):
+        separator, remaining = separators[-1], []
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator, remaining = candidate, separators[i + 1 :]
+                break
+
+        good = []
+        for a, b in self._pieces(text, start, end, separator):
+            if length(a, b) < self.chunk_size:
+                good.append((a, b))
+                continue
+            if good:
+                self._merge(text, good, length, chunks)
+                good = []
+            if not remaining:
+                chunks.append(text[a:b])
+            else:
+                self._split(text, a, b, remaining, length, chunks)
+        if good:
+            self._merge(text, good, length, chunks)
+
+    def _merge(self, text, spans, length, chunks):
+        """Greedy merge of consecutive spans into chunks with overlap.
+
+        Separators are kept inside the pieces, so the join separator is
+        empty and a window of consecutive spans is one slice of `text`.
+        """
+        window_start = 0  # index into spans of the current window's first piece
+        window_end = 0
+        total = 0
+
+        def emit():
+            chunk = text[spans[window_start][0] : spans[window_end - 1][1]].strip()
+            if chunk:
+                chunks.append(chunk)
+
+        lengths = [length(a, b) for a, b in spans]
+        for i, piece_len in enumerate(lengths):
+            if total + piece_len > self.chunk_size:
+                if window_end > window_start:
+                    emit()
+                    while total > self.chunk_overlap or (
+                        total + piece_len > self.chunk_size and total > 0
+                    ):
+                        total -= lengths[window_start]
+                        window_start += 1
+            window_end = i + 1
+            total += piece_len
+        if window_end > window_start:
+            emit()
+
+
+def _split_batch(args):
+    pages, kwargs = args
+    return FastSplitter(**kwargs).split_documents(pages)
+
+
+def parallel_split(documents, max_workers: int | None = None, batch_size: int = 64, **kwargs):
+    """Split pages across worker processes, keeping the input order.
+
+    `kwargs` are FastSplitter arguments. Pages are sent in batches of
+    `batch_size` so pickling overhead stays small next to the work.
+    """
+    documents = list(documents)
+    batches = [documents[i : i + batch_size] for i in range(0, len(documents), batch_size)]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = pool.map(_split_batch, [(batch, kwargs) for batch in batches])
+        return [chunk for batch in results for chunk in batch]
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import wraps
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """Process-wide keep-alive session shared by every HTTP-backed tool.
+
+    Reusing it skips the TCP + TLS handshake on every call after the first
+    one to a host.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after `ttl` seconds.
+
+    `ttl=None` keeps entries until they are evicted by `maxsize`.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, ttl: float | None, maxsize: int = 256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, self._MISSING)
+            if item is self._MISSING:
+                return default
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def ttl_cache(ttl: float | None, maxsize: int = 256):
+    """Cache a fetch function's results per arguments, with in-flight de-duplication.
+
+    Concurrent calls with the same arguments share one request: the first
+    caller performs it, the rest wait for its result. Exceptions are passed
+    to every waiter and are never cached, so failed requests are retried on
+    the next call.
+    """
+
+    def decorator(fn):
+        cache = TTLCache(ttl, maxsize)
+        inflight = {}
+        lock = threading.Lock()
+        missing = object()
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            value = cache.get(key, missing)
+            if value is not missing:
+                return value
+            with lock:
+                future = inflight.get(key)
+                owner = future is None
+                if owner:
+                    future = inflight[key] = Future()
+            if not owner:
+                return future.result()
+            try:
+                value = fn(*args, **kwargs)
+                cache.set(key, value)
+                future.set_result(value)
+                return value
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                with lock:
+                    del inflight[key]
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
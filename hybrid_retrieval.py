@@ -0,0 +1,215 @@
+import json
+import math
+import re
+from array import array
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+
+import numpy as np
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+# keeps part numbers / error codes such as "E-1042", "v2.3.1" or "0x1F" whole
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring over docstore ids.
+
+    Each chunk gets an int row; a term's postings are two parallel int32
+    arrays (rows, term frequencies), sorted because rows only grow, so a
+    query scores every posting of a term in one numpy expression. Supports
+    incremental add/remove so it can follow the vector store through
+    incremental re-indexing: removed rows are masked out and purged on the
+    next `compact()` / `save()`. Persisted as one .npz next to the store.
+    Terms occurring in more than `max_df` of all chunks are ignored at
+    query time: they carry almost no signal and have the longest postings.
+    The cut only applies once the index holds `max_df_min_docs` chunks; on
+    a handful of chunks every query term easily passes the threshold.
+    """
+
+    def __init__(
+        self, k1: float = 1.5, b: float = 0.75, max_df: float = 0.5, max_df_min_docs: int = 100
+    ):
+        self.k1 = k1
+        self.b = b
+        self.max_df = max_df
+        self.max_df_min_docs = max_df_min_docs
+        self.postings = {}  # term -> (array rows, array term frequencies)
+        self.ids = []  # row -> doc_id
+        self.rows = {}  # doc_id -> row
+        self.doc_len = array("i")  # row -> length in tokens
+        self.alive = bytearray()  # row -> 1 until removed
+        self.total_len = 0
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, doc_id: str, text: str):
+        if doc_id in self.rows:
+            self.remove(doc_id)
+        row = len(self.ids)
+        terms = Counter(tokenize(text))
+        for term, tf in terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = (array("i"), array("i"))
+            postings[0].append(row)
+            postings[1].append(tf)
+        length = sum(terms.values())
+        self.ids.append(doc_id)
+        self.rows[doc_id] = row
+        self.doc_len.append(length)
+        self.alive.append(1)
+        self.total_len += length
+
+    def remove(self, doc_id: str):
+        row = self.rows.pop(doc_id, None)
+        if row is None:
+            return
+        self.alive[row] = 0
+        self.total_len -= self.doc_len[row]
+
+    def compact(self):
+        """Drop removed rows from the postings and renumber the rest."""
+        if len(self.rows) == len(self.ids):
+            return
+        alive = np.frombuffer(self.alive, dtype=np.bool_)
+        new_row = np.cumsum(alive, dtype=np.int32) - 1
+        postings = {}
+        for term, (rows, tfs) in self.postings.items():
+            rows = np.frombuffer(rows, dtype=np.int32)
+            keep = alive[rows]
+            if keep.any():
+                postings[term] = (
+                    array("i", new_row[rows[keep]].tobytes()),
+                    array("i", np.frombuffer(tfs, dtype=np.int32)[keep].tobytes()),
+                )
+        self.postings = postings
+        self.doc_len = array("i", np.frombuffer(self.doc_len, dtype=np.int32)[alive].tobytes())
+        self.ids = [doc_id for doc_id, ok in zip(self.ids, self.alive) if ok]
+        self.rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self.alive = bytearray(b"\x01" * len(self.ids))
+
+    def search(self, query: str, k: int) -> list[tuple[str, float]]:
+        n = len(self.rows)
+        if not n:
+            return []
+        avg_len = self.total_len / n
+        max_df = self.max_df * n if n >= self.max_df_min_docs else n
+        alive = np.frombuffer(self.alive, dtype=np.bool_)
+        doc_len = np.frombuffer(self.doc_len, dtype=np.int32)
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            rows = np.frombuffer(postings[0], dtype=np.int32)
+            live = alive[rows]
+            df = int(np.count_nonzero(live))
+            if not df or df > max_df:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            rows = rows[live]
+            tf = np.frombuffer(postings[1], dtype=np.int32)[live].astype(np.float32)
+            norm = self.k1 * (1 - self.b + self.b * doc_len[rows] / avg_len)
+            scores[rows] += idf * tf * (self.k1 + 1) / (tf + norm)
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(scores[hits], -k)[-k:]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(self.ids[row], float(scores[row])) for row in hits]
+
+    def save(self, path: str):
+        """Write the index as .npz: ids and terms as JSON, postings concatenated."""
+        self.compact()
+        counts = [len(rows) for rows, _ in self.postings.values()]
+        meta = {"ids": self.ids, "terms": list(self.postings)}
+        rows = b"".join(rows.tobytes() for rows, _ in self.postings.values())
+        tfs = b"".join(tfs.tobytes() for _, tfs in self.postings.values())
+        with open(path, "wb") as f:  # a file object, so numpy keeps the name as given
+            np.savez(
+                f,
+                meta=np.array(json.dumps(meta)),
+                offsets=np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+                rows=np.frombuffer(rows, dtype=np.int32),
+                tfs=np.frombuffer(tfs, dtype=np.int32),
+                doc_len=np.frombuffer(self.doc_len, dtype=np.int32),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        index = cls()
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            offsets, rows, tfs = data["offsets"], data["rows"], data["tfs"]
+            index.doc_len = array("i", data["doc_len"].astype(np.int32).tobytes())
+        for term, start, end in zip(meta["terms"], offsets[:-1], offsets[1:]):
+            index.postings[term] = (
+                array("i", rows[start:end].tobytes()),
+                array("i", tfs[start:end].tobytes()),
+            )
+        index.ids = meta["ids"]
+        index.rows = {doc_id: row for row, doc_id in enumerate(index.ids)}
+        index.alive = bytearray(b"\x01" * len(index.ids))
+        index.total_len = sum(index.doc_len)
+        return index
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], rrf_k: int = 60) -> list[str]:
+    """Fuse ranked id lists: score(id) = Σ 1 / (rrf_k + rank)."""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """FAISS + BM25 retrieval fused with reciprocal rank fusion.
+
+    Both retrievers fetch `fetch_k` candidates; the top `k` after fusion
+    are returned. Exact tokens such as part numbers rank high through BM25
+    even when their embedding neighbours do not. With `bm25=None` it is a
+    plain top-k vector search.
+
+    With a `tracer` the query embedding and the index search (FAISS and
+    BM25) are timed as their own stages, "embed_query" and "search".
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: object
+    bm25: BM25Index | None = None
+    k: int = 3
+    fetch_k: int = 20
+    rrf_k: int = 60
+    tracer: object | None = None
+
+    def _span(self, name: str):
+        return self.tracer.span(name) if self.tracer else nullcontext({})
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        with self._span("embed_query"):
+            embedding = self.vectorstore.embeddings.embed_query(query)
+        with self._span("search") as attrs:
+            if self.bm25 is None:
+                docs = self.vectorstore.similarity_search_by_vector(embedding, k=self.k)
+                attrs["documents"] = len(docs)
+                return docs
+            vector_docs = self.vectorstore.similarity_search_by_vector(embedding, k=self.fetch_k)
+            lexical_ids = [doc_id for doc_id, _ in self.bm25.search(query, self.fetch_k)]
+            attrs["documents"] = len(vector_docs) + len(lexical_ids)
+        vector_ids = [doc.id for doc in vector_docs]
+        fused = reciprocal_rank_fusion([vector_ids, lexical_ids], self.rrf_k)[: self.k]
+        by_id = {doc.id: doc for doc in vector_docs}
+        return [by_id.get(doc_id) or self.vectorstore.docstore.search(doc_id) for doc_id in fused]
@@ -0,0 +1,182 @@
+import base64
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+from http_tools import TTLCache, http_session
+
+# Largest side worth sending: LLaVA-style models tile at 336/672 px and
+# Gemini bills per 768 px tile, so bigger images only cost upload and tokens.
+MAX_SIDE = {"llava": 672, "gemini": 1536}
+
+CHUNK = 3 * 64 * 1024  # multiple of 3, so base64 pieces concatenate without padding
+
+# leading bytes of the formats multimodal APIs accept
+MAGIC = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+]
+
+
+def sniff_mime(path: str) -> str:
+    """MIME type of an image file from its magic bytes."""
+    with open(path, "rb") as f:
+        head = f.read(16)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":  # ISO base media: HEIC / HEIF / AVIF
+        brand = head[8:12]
+        if brand == b"avif":
+            return "image/avif"
+        if brand in (b"heic", b"heix", b"mif1", b"msf1"):
+            return "image/heic"
+    for magic, mime_type in MAGIC:
+        if head.startswith(magic):
+            return mime_type
+    return "application/octet-stream"
+
+
+class ImageCache:
+    """Content-addressed on-disk cache for images sent to multimodal models.
+
+    Layout under `cache_dir`:
+        urls/<sha256(url)>                   sha256 of the downloaded bytes
+        raw/<content sha256>                 the original image
+        enc/<content sha256>-<side>-<q>.jpg  downscaled JPEG
+        enc/<content sha256>-<side>-<q>.b64  its base64 payload
+
+    A repeated request reads the .b64 file (or the in-memory copy) and
+    skips the download, the resize and the encoding. Downloads go through
+    the pooled `http_session()` and are streamed to disk, hashed on the way.
+    Resizing needs Pillow; without it the original bytes are encoded as-is
+    and their MIME type is taken from the file's magic bytes.
+    """
+
+    def __init__(self, cache_dir: str = ".image_cache", quality: int = 85, memory_items: int = 32):
+        self.cache_dir = cache_dir
+        self.quality = quality
+        self.memory = TTLCache(ttl=None, maxsize=memory_items)
+        for sub in ("urls", "raw", "enc"):
+            os.makedirs(os.path.join(cache_dir, sub), exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Fetching
+    # ------------------------------------------------------------------
+    def _path(self, *parts) -> str:
+        return os.path.join(self.cache_dir, *parts)
+
+    def _write_atomic(self, path: str, chunks):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)  # never leave a partial temp file behind
+            raise
+
+    def fetch(self, source: str) -> str:
+        """Content hash of `source` (URL or local path), downloading it once."""
+        if not source.startswith(("http://", "https://")):
+            digest = hashlib.sha256()
+            with open(source, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK), b""):
+                    digest.update(chunk)
+            content = digest.hexdigest()
+            raw = self._path("raw", content)
+            if not os.path.exists(raw):
+                with open(source, "rb") as f:
+                    self._write_atomic(raw, iter(lambda: f.read(CHUNK), b""))
+            return content
+
+        url_file = self._path("urls", hashlib.sha256(source.encode()).hexdigest())
+        if os.path.exists(url_file):
+            with open(url_file) as f:
+                content = f.read().strip()
+            if os.path.exists(self._path("raw", content)):
+                return content
+
+        digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=self._path("raw"))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                with http_session().get(source, stream=True, timeout=30) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(CHUNK):
+                        digest.update(chunk)
+                        f.write(chunk)
+            content = digest.hexdigest()
+            os.replace(tmp, self._path("raw", content))
+        except BaseException:
+            os.unlink(tmp)  # failed or interrupted download
+            raise
+        self._write_atomic(url_file, [content.encode()])
+        return content
+
+    # ------------------------------------------------------------------
+    # Downscaling and encoding
+    # ------------------------------------------------------------------
+    def prepared(self, content: str, max_side: int) -> tuple[str, str]:
+        """Path and MIME type of the image re-encoded to fit `max_side`."""
+        raw = self._path("raw", content)
+        out = self._path("enc", f"{content}-{max_side}-{self.quality}.jpg")
+        if os.path.exists(out):
+            return out, "image/jpeg"
+        try:
+            from PIL import Image
+        except ImportError:
+            print("⚠️  Pillow not installed – sending the image without resizing")
+            return raw, sniff_mime(raw)
+
+        with Image.open(raw) as image:
+            before = image.size
+            # JPEG decoders can downscale by 1/2–1/8 while decoding
+            image.draft("RGB", (max_side, max_side))
+            image = image.convert("RGB")
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+            buffer = BytesIO()
+            image.save(buffer, "JPEG", quality=self.quality, optimize=True)
+        self._write_atomic(out, [buffer.getvalue()])
+        print(
+            f"🖼️  Resized {before[0]}x{before[1]} → {image.size[0]}x{image.size[1]} "
+            f"({os.path.getsize(raw) / 1024:.0f} KB → {os.path.getsize(out) / 1024:.0f} KB)"
+        )
+        return out, "image/jpeg"
+
+    def _encode_file(self, path: str, out: str):
+        """Base64-encode `path` into `out` a chunk at a time."""
+
+        def pieces():
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK), b""):
+                    yield base64.b64encode(chunk)
+
+        self._write_atomic(out, pieces())
+
+    def to_base64(self, source: str, max_side: int = 1536) -> tuple[str, str]:
+        """(base64 payload, MIME type) for `source`, cached on disk and in memory."""
+        cached = self.memory.get((source, max_side))
+        if cached is not None:
+            return cached
+        content = self.fetch(source)
+        path, mime_type = self.prepared(content, max_side)
+        out = self._path("enc", f"{content}-{max_side}-{self.quality}.b64")
+        if path == self._path("raw", content):  # not resized
+            out = self._path("enc", f"{content}-raw.b64")
+        if not os.path.exists(out):
+            self._encode_file(path, out)
+        with open(out) as f:
+            result = (f.read(), mime_type)
+        self.memory.set((source, max_side), result)
+        return result
+
+    def data_uri(self, source: str, max_side: int = 1536) -> str:
+        payload, mime_type = self.to_base64(source, max_side)
+        return f"data:{mime_type};base64,{payload}"
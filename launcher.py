@@ -0,0 +1,200 @@
+# --------------------------------------------------
+# Shared startup helpers: lazy imports, lazily built objects, Ollama warm-up
+# --------------------------------------------------
+# The LangChain agent stack costs seconds to import (langchain.agents
+# pulls in LangGraph) and models/agents used to be built at import time,
+# so scripts showed their first prompt only after all of it. With these
+# helpers a script shows its prompt first and builds the rest in the
+# background while the user types.
+#
+#   python launcher.py --importtime pokeapi   # where does import time go?
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+
+def _process_age() -> float:
+    """Seconds since this process started (Linux), else 0."""
+    try:
+        with open("/proc/self/stat") as f:
+            started = int(f.read().rsplit(")", 1)[1].split()[19]) / os.sysconf("SC_CLK_TCK")
+        with open("/proc/uptime") as f:
+            return max(0.0, float(f.read().split()[0]) - started)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+_START = time.perf_counter() - _process_age()  # interpreter start where available
+_timings = []  # (kind, name, seconds)
+_timings_lock = threading.Lock()
+
+
+def _record(kind: str, name: str, seconds: float):
+    with _timings_lock:
+        _timings.append((kind, name, seconds))
+
+
+class LazyModule:
+    """Module proxy that imports `name` on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                start = time.perf_counter()
+                self._module = importlib.import_module(self._name)
+                _record("import", self._name, time.perf_counter() - start)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._module or self._load(), attr)
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+class Lazy:
+    """Build an object once, on first `get()`, or ahead of time in a
+    background thread with `prefetch()`. Thread-safe: concurrent callers
+    wait for the one build. Build errors are re-raised by `get()`."""
+
+    def __init__(self, factory, name: str | None = None):
+        self.factory = factory
+        self.name = name or getattr(factory, "__name__", "object")
+        self._value = None
+        self._error = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def _build(self):
+        start = time.perf_counter()
+        try:
+            self._value = self.factory()
+        except BaseException as e:
+            self._error = e
+        finally:
+            _record("build", self.name, time.perf_counter() - start)
+            self._done.set()
+
+    def _claim(self) -> bool:
+        with self._lock:
+            if self._started:
+                return False
+            self._started = True
+            return True
+
+    def prefetch(self) -> "Lazy":
+        if self._claim():
+            threading.Thread(target=self._build, name=f"build-{self.name}", daemon=True).start()
+        return self
+
+    def get(self):
+        if self._claim():
+            self._build()
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    @property
+    def built(self) -> bool:
+        return self._done.is_set() and self._error is None
+
+
+def warm_up_ollama(model: str, base_url: str = "http://localhost:11434", keep_alive: str = "30m"):
+    """Load `model` into Ollama memory in the background.
+
+    A generate request without a prompt only loads the model, so the first
+    real question does not pay the load time. Failures are ignored – the
+    first real call reports them.
+    """
+
+    def warm():
+        from http_tools import http_session
+
+        start = time.perf_counter()
+        try:
+            http_session().post(
+                f"{base_url}/api/generate",
+                json={"model": model, "keep_alive": keep_alive},
+                timeout=120,
+            ).raise_for_status()
+            _record("warm-up", model, time.perf_counter() - start)
+        except Exception:
+            pass
+
+    thread = threading.Thread(target=warm, name=f"warm-{model}", daemon=True)
+    thread.start()
+    return thread
+
+
+def mark_ready(label: str = "prompt"):
+    """Record the time from process start to `label`."""
+    _record("ready", label, time.perf_counter() - _START)
+
+
+def startup_report():
+    with _timings_lock:
+        rows = list(_timings)
+    if not rows:
+        return
+    print("\n🚀 Startup breakdown")
+    for kind, name, seconds in rows:
+        print(f"   {kind:<8} {name:<32} {seconds:7.3f}s")
+
+
+# ----------------------------------------------------------------------
+# `python -X importtime` summary
+# ----------------------------------------------------------------------
+def import_profile(module: str, top: int = 15) -> list[tuple[str, float]]:
+    """Import `module` in a fresh interpreter under -X importtime and return
+    the `top` packages by self time, in seconds.
+
+    The module is imported, not run, so scripts should keep their
+    interactive part behind `if __name__ == "__main__"`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    by_package = defaultdict(int)  # microseconds
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:") :].split("|")
+        try:
+            self_us = int(fields[0])
+        except ValueError:  # header line
+            continue
+        by_package[fields[2].strip().split(".")[0]] += self_us
+    ranked = sorted(by_package.items(), key=lambda item: item[1], reverse=True)
+    return [(package, us / 1e6) for package, us in ranked[:top]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time breakdown of a script")
+    parser.add_argument("--importtime", metavar="MODULE", required=True)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = import_profile(args.importtime, args.top)
+    total = sum(seconds for _, seconds in rows)
+    print(f"📦 import {args.importtime}: top {len(rows)} packages by self time ({total:.2f}s)")
+    for package, seconds in rows:
+        print(f"   {package:<32} {seconds:7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# --------------------------------------------------
+# Offline load test for the Pokédex agent (pokeapi.py)
+# --------------------------------------------------
+# 1. Record once against the live Ollama server and PokeAPI:
+#      python load_test.py --record
+#    Model responses (streamed chunks, tool calls, timings) and tool
+#    results are stored in cassettes/pokedex.jsonl.gz.
+# 2. Replay with no network, N concurrent sessions through create_agent:
+#      python load_test.py --sessions 50 --ttft 0.3 --token-latency 0.02
+#    Without --ttft / --token-latency the recorded timings are replayed
+#    (scaled by --time-scale, 0 = instant). Framework overhead is the turn
+#    latency minus the synthetic model latency injected per turn.
+import argparse
+import asyncio
+import json
+import time
+
+from langchain.agents import create_agent
+from langchain_core.tools import tool
+
+from conversation_memory import ConversationMemory
+from parallel_tools import ParallelToolMiddleware, parallel_config
+from replay import Cassette, ReplayChatModel, ReplayToolMiddleware
+from tracing import Tracer, TracingMiddleware
+
+QUESTIONS = [
+    "Tell me about pikachu",
+    "How tall is charizard?",
+    "What abilities does bulbasaur have?",
+]
+
+
+def build_agent(model, cassette: Cassette, record: bool, tracer: Tracer, tool_latency: float):
+    from pokeapi import pokemon_lookup, strict_system_prompt
+
+    return create_agent(
+        model=model,
+        tools=[tool(pokemon_lookup)],
+        system_prompt=strict_system_prompt,
+        middleware=[
+            TracingMiddleware(tracer),
+            ParallelToolMiddleware(max_concurrency=8, timeouts={"pokemon_lookup": 15}),
+            ReplayToolMiddleware(cassette, record=record, latency=tool_latency),
+        ],
+    )
+
+
+async def session(agent, questions: list[str], latencies: list[float]):
+    """One user's conversation, handled the way run_pokedex() does."""
+    memory = ConversationMemory(max_tokens=3000, keep_recent_turns=3)
+    for question in questions:
+        memory.add_user_message(question)
+        sent = memory.messages()
+        start = time.perf_counter()
+        result = await agent.ainvoke({"messages": sent}, config=parallel_config(8))
+        latencies.append(time.perf_counter() - start)
+        memory.add_agent_messages(result["messages"][len(sent):])
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Record / replay load test for the Pokédex agent")
+    parser.add_argument("--cassette", default="cassettes/pokedex.jsonl.gz")
+    parser.add_argument("--record", action="store_true", help="record against the live model and tools")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--ttft", type=float, default=None)
+    parser.add_argument("--token-latency", type=float, default=None)
+    parser.add_argument("--time-scale", type=float, default=1.0)
+    parser.add_argument("--tool-latency", type=float, default=0.0)
+    parser.add_argument("--output", default="load_test.json")
+    args = parser.parse_args()
+
+    cassette = Cassette(args.cassette)
+    tracer = Tracer()
+    if args.record:
+        from pokeapi import llm
+
+        model = ReplayChatModel(cassette=cassette, inner=llm.get())
+    else:
+        model = ReplayChatModel(
+            cassette=cassette,
+            ttft=args.ttft,
+            token_latency=args.token_latency,
+            time_scale=args.time_scale,
+        )
+    agent = build_agent(model, cassette, args.record, tracer, args.tool_latency)
+
+    latencies = []
+    sessions = 1 if args.record else args.sessions
+    start = time.perf_counter()
+    await asyncio.gather(*[session(agent, QUESTIONS, latencies) for _ in range(sessions)])
+    elapsed = time.perf_counter() - start
+
+    if args.record:
+        cassette.save()
+        print(f"📼 Recorded {len(cassette.entries)} calls to {args.cassette}")
+        return
+
+    turns = len(latencies)
+    tool_calls = tracer.summary().get("tool:pokemon_lookup", {}).get("count", 0)
+    synthetic = (model.simulated_seconds[0] + tool_calls * args.tool_latency) / turns
+    mean = sum(latencies) / turns
+    report = {
+        "sessions": sessions,
+        "turns": turns,
+        "seconds": round(elapsed, 3),
+        "turns_per_s": round(turns / elapsed, 2),
+        "turn_latency_s": {
+            "mean": round(mean, 4),
+            "p50": round(percentile(latencies, 0.5), 4),
+            "p95": round(percentile(latencies, 0.95), 4),
+            "p99": round(percentile(latencies, 0.99), 4),
+        },
+        "synthetic_latency_per_turn_s": round(synthetic, 4),
+        "framework_overhead_per_turn_s": round(mean - synthetic, 4),
+    }
+    print(json.dumps(report, indent=2))
+    tracer.print_summary()
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -11,6 +11,9 @@ from langchain_core.tools import tool, ToolRuntime
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import create_tool_calling_agent
 from pydantic import BaseModel, Field
+
+from weather import fetch_weather
+
 load_dotenv()
 
 # --- Schemas ---
@@ -25,14 +28,12 @@ class ResponseFormat(BaseModel):
 class Context:
     user_id: str
 
-# --- Tools (Unchanged) ---
+# --- Tools ---
 @tool
 def get_weather(city: str) -> dict:
     """Gets the weather for a given city using wttr.in. Returns a JSON dictionary."""
     try:
-        response = requests.get(f"https://wttr.in/{city}?format=j1")
-        response.raise_for_status()
-        return response.json()
+        return fetch_weather(city.strip().lower())
     except requests.exceptions.RequestException as e:
         return {"error": f"Error getting weather: {e}"}
     except requests.exceptions.JSONDecodeError:
@@ -5,6 +5,9 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import create_agent
 from langchain.agents.middleware import ModelRequest, ModelResponse, dynamic_prompt
 
+from prompt_cache import PromptCacheMiddleware, cached_prompt
+from replay import replayable
+
 load_dotenv()
 
 @dataclass
@@ -12,6 +15,7 @@ class Context:
     user_role: str
 
 @dynamic_prompt
+@cached_prompt(key=lambda request: request.runtime.context.user_role)
 def user_role_prompt(request: ModelRequest) -> str:
     user_role = request.runtime.context.user_role
 
@@ -27,11 +31,11 @@ def user_role_prompt(request: ModelRequest) -> str:
         case _:
             return base_prompt
         
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.3)
+llm = replayable(ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.3), "middlewear")
 
 agent = create_agent(
     model=llm,
-    middleware=[user_role_prompt],
+    middleware=[user_role_prompt, PromptCacheMiddleware(gemini_cache_ttl="3600s")],
     context_schema=Context
 )
 
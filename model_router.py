@@ -0,0 +1,203 @@
+import json
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+from langchain_core.messages import ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+
+@dataclass
+class ModelTier:
+    name: str
+    model: Any
+    cost: float  # relative cost, only used for ordering
+    max_complexity: float = float("inf")  # hardest request this tier should take
+
+
+class ModelStats:
+    """Rolling latency / error window for one model: the last `window`
+    calls, ignoring those older than `max_age` seconds."""
+
+    def __init__(self, window: int = 100, max_age: float = 300.0):
+        self.max_age = max_age
+        self.samples = deque(maxlen=window)  # (monotonic time, latency, ok)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self.samples.append((time.monotonic(), latency, ok))
+
+    def _fresh(self) -> list[tuple[float, float, bool]]:
+        cutoff = time.monotonic() - self.max_age
+        with self._lock:
+            while self.samples and self.samples[0][0] < cutoff:
+                self.samples.popleft()
+            return list(self.samples)
+
+    def __len__(self) -> int:
+        return len(self._fresh())
+
+    def percentile(self, q: float) -> float | None:
+        ordered = sorted(latency for _, latency, ok in self._fresh() if ok)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def error_rate(self) -> float:
+        samples = self._fresh()
+        return sum(not ok for _, _, ok in samples) / len(samples) if samples else 0.0
+
+
+class ModelRouter(AgentMiddleware):
+    """Send each model call to the cheapest model that can take it within the SLO.
+
+    Complexity is estimated from the prompt size, whether tools are bound
+    and how many tool calls already failed in this conversation. Tiers are
+    tried from cheapest to most expensive; a tier is skipped when the
+    request is too complex for it or when it is unhealthy (rolling p95
+    latency above `latency_slo` or error rate above `max_error_rate`, once
+    it has `min_samples` calls). If the chosen model raises, the next tier
+    is tried automatically.
+
+    An unhealthy tier gets little traffic, so its window would never
+    refresh. Two things let it recover: samples older than `max_age`
+    seconds are dropped, and every `probe_every`-th request tries the
+    cheapest unhealthy capable tier first (a half-open probe), falling back
+    as usual if it still fails.
+
+    `metrics()` returns routing counters plus p50/p95/error rate per model;
+    with `metrics_path` every decision is also appended there as JSONL.
+    """
+
+    def __init__(
+        self,
+        tiers: list[ModelTier],
+        latency_slo: float = 10.0,
+        max_error_rate: float = 0.2,
+        min_samples: int = 5,
+        max_age: float = 300.0,
+        probe_every: int = 20,
+        metrics_path: str | None = None,
+    ):
+        super().__init__()
+        self.tiers = sorted(tiers, key=lambda tier: tier.cost)
+        self.latency_slo = latency_slo
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.probe_every = probe_every
+        self.metrics_path = metrics_path
+        self.stats = {tier.name: ModelStats(max_age=max_age) for tier in self.tiers}
+        self.requests = 0
+        self.decisions = Counter()
+        self.fallbacks = Counter()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+    @staticmethod
+    def complexity(request: ModelRequest) -> float:
+        """~1 point per 1k prompt tokens, +1 with tools, +1 per failed tool call."""
+        messages = request.messages
+        score = count_tokens_approximately(messages) / 1000
+        if request.tools:
+            score += 1
+        score += sum(
+            1 for m in messages if isinstance(m, ToolMessage) and getattr(m, "status", None) == "error"
+        )
+        return score
+
+    def healthy(self, tier: ModelTier) -> bool:
+        stats = self.stats[tier.name]
+        if len(stats) < self.min_samples:
+            return True
+        p95 = stats.percentile(0.95)
+        return (p95 is None or p95 <= self.latency_slo) and stats.error_rate <= self.max_error_rate
+
+    def candidates(self, score: float) -> list[ModelTier]:
+        """Tiers in the order they should be tried for a request of `score`."""
+        capable = [tier for tier in self.tiers if tier.max_complexity >= score] or self.tiers[-1:]
+        healthy = [tier for tier in capable if self.healthy(tier)]
+        # unhealthy tiers stay at the back as a last resort
+        unhealthy = [tier for tier in capable if tier not in healthy]
+        with self._lock:
+            self.requests += 1
+            probe = unhealthy and self.probe_every and self.requests % self.probe_every == 0
+        if probe and healthy and unhealthy[0].cost < healthy[0].cost:
+            # half-open probe: give the cheaper tier a chance to recover
+            return unhealthy[:1] + healthy + unhealthy[1:]
+        return healthy + unhealthy
+
+    def wrap_model_call(self, request: ModelRequest, handler) -> ModelResponse:
+        score = self.complexity(request)
+        order = self.candidates(score)
+        for attempt, tier in enumerate(order):
+            start = time.perf_counter()
+            try:
+                response = handler(request.override(model=tier.model))
+            except Exception:
+                self._record(tier, score, time.perf_counter() - start, ok=False, attempt=attempt)
+                if attempt == len(order) - 1:
+                    raise
+                continue
+            self._record(tier, score, time.perf_counter() - start, ok=True, attempt=attempt)
+            return response
+
+    async def awrap_model_call(self, request: ModelRequest, handler) -> ModelResponse:
+        score = self.complexity(request)
+        order = self.candidates(score)
+        for attempt, tier in enumerate(order):
+            start = time.perf_counter()
+            try:
+                response = await handler(request.override(model=tier.model))
+            except Exception:
+                self._record(tier, score, time.perf_counter() - start, ok=False, attempt=attempt)
+                if attempt == len(order) - 1:
+                    raise
+                continue
+            self._record(tier, score, time.perf_counter() - start, ok=True, attempt=attempt)
+            return response
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def _record(self, tier: ModelTier, score: float, latency: float, ok: bool, attempt: int):
+        with self._lock:
+            self.stats[tier.name].record(latency, ok)
+            self.decisions[tier.name] += 1
+            if attempt:
+                self.fallbacks[tier.name] += 1
+            if self.metrics_path:
+                with open(self.metrics_path, "a") as f:
+                    f.write(
+                        json.dumps(
+                            {
+                                "ts": time.time(),
+                                "model": tier.name,
+                                "complexity": round(score, 3),
+                                "latency_s": round(latency, 4),
+                                "ok": ok,
+                                "fallback": bool(attempt),
+                            }
+                        )
+                        + "\n"
+                    )
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                tier.name: {
+                    "calls": self.decisions[tier.name],
+                    "fallback_calls": self.fallbacks[tier.name],
+                    "p50_s": self.stats[tier.name].percentile(0.5),
+                    "p95_s": self.stats[tier.name].percentile(0.95),
+                    "error_rate": self.stats[tier.name].error_rate,
+                    "healthy": self.healthy(tier),
+                }
+                for tier in self.tiers
+            }
@@ -1,17 +1,26 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
 
+from image_cache import MAX_SIDE, ImageCache
+
 load_dotenv()
 
 llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
 
+# Send the downscaled image inline from the local cache instead of the
+# remote URL, which would be downloaded again on every call.
+image_base64, mime_type = ImageCache().to_base64(
+    'https://www.sony.co.jp/en/Products/di_photo-gallery/images/extralarge/1887.JPG',
+    max_side=MAX_SIDE["gemini"],
+)
+
 message = {
     "role": "user",
     "content": [
         {'type': 'text', 'text': 'Describe the contents of this imagea.'},
-        {'type': 'image', 'url': 'https://www.sony.co.jp/en/Products/di_photo-gallery/images/extralarge/1887.JPG'}
+        {'type': 'image', 'base64': image_base64, 'mime_type': mime_type}
     ]
 }
 
 response = llm.invoke([message])
-print(response.content)
\ No newline at end of file
+print(response.content)
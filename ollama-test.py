@@ -1,7 +1,5 @@
 import os
 import requests
-import base64
-from io import BytesIO
 from dotenv import load_dotenv
 
 # Use the community package for local models like Ollama
@@ -9,21 +7,24 @@ from langchain_ollama import ChatOllama
 # Use the core package for message types
 from langchain_core.messages import HumanMessage
 
+from image_cache import MAX_SIDE, ImageCache
+
 load_dotenv()
 
-# --- Helper Function to Handle Image URL to Base64 ---
+image_cache = ImageCache()
+
+# --- Helper Function to Handle Image URL to a Data URI ---
+
+def url_to_data_uri(url: str) -> str:
+    """Fetches an image from a URL and converts it to a base64 data URI.
 
-def url_to_base64(url: str) -> str:
-    """Fetches an image from a URL and converts it to a base64 encoded string."""
+    Downloads, the resize to the model's useful resolution and the encoding
+    are cached on disk, so repeated runs reuse the payload. The MIME type is
+    the one of the payload actually sent (JPEG after a resize, otherwise the
+    original format).
+    """
     try:
-        response = requests.get(url)
-        response.raise_for_status() # Raise an exception for bad status codes
-        
-        # Get the binary content
-        image_bytes = response.content
-        
-        # Encode to Base64
-        return base64.b64encode(image_bytes).decode('utf-8')
+        return image_cache.data_uri(url, max_side=MAX_SIDE["llava"])
 
     except requests.RequestException as e:
         print(f"Error fetching image: {e}")
@@ -38,9 +39,9 @@ llm = ChatOllama(model="llama3.1:8b", temperature=0.0) # This model needs to be
 
 # 2. Process Image
 image_url = 'https://www.sony.co.jp/en/Products/di_photo-gallery/images/extralarge/1887.JPG'
-base64_image = url_to_base64(image_url)
+image_data_uri = url_to_data_uri(image_url)
 
-if not base64_image:
+if not image_data_uri:
     print("Could not process image, exiting.")
     exit()
 
@@ -49,7 +50,7 @@ message = HumanMessage(
     content=[
         {'type': 'text', 'text': 'Describe the contents of this image.'},
         # Ollama expects the data URI for the image
-        {'type': 'image_url', 'image_url': {'url': f'data:image/jpeg;base64,{base64_image}'}}
+        {'type': 'image_url', 'image_url': {'url': image_data_uri}}
     ]
 )
 
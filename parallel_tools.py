@@ -0,0 +1,88 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import ToolMessage
+
+
+class ParallelToolMiddleware(AgentMiddleware):
+    """Bounded, time-limited execution of the tool calls in one model turn.
+
+    `create_agent` dispatches every tool call of a turn as its own graph
+    task, and LangGraph runs those tasks concurrently, so a turn already
+    takes as long as its slowest tool. This middleware puts limits on that:
+
+    * at most `max_concurrency` tool calls run at once (across all sessions
+      sharing this middleware instance);
+    * each call gets `timeouts[tool_name]` (or `default_timeout`) seconds,
+      after which the model receives an error ToolMessage instead of
+      waiting forever.
+
+    Results keep their tool_call_id, so the model sees them in the order it
+    issued the calls. Pass `config=parallel_config(n)` to `invoke` to also
+    let LangGraph run up to n tasks per step.
+
+    A sync tool that times out cannot be killed; its thread finishes in the
+    background and its result is discarded. Its slot stays taken until the
+    thread returns, so hung tools never oversubscribe the worker pool:
+    with every slot held, a new call waits for one up to its own timeout
+    and then gets an error without having run. The timeout starts once the
+    call has a slot, i.e. when its worker thread picks it up.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        default_timeout: float = 30.0,
+        timeouts: dict[str, float] | None = None,
+    ):
+        super().__init__()
+        self.max_concurrency = max_concurrency
+        self.default_timeout = default_timeout
+        self.timeouts = timeouts or {}
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._async_slots = None
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="tool"
+        )
+
+    def _timeout_message(self, request, timeout: float, started: bool = True) -> ToolMessage:
+        name = request.tool_call["name"]
+        reason = "timed out" if started else "found no free worker"
+        return ToolMessage(
+            content=f"ERROR: tool '{name}' {reason} after {timeout:.0f}s",
+            tool_call_id=request.tool_call["id"],
+            name=name,
+            status="error",
+        )
+
+    def wrap_tool_call(self, request, handler):
+        timeout = self.timeouts.get(request.tool_call["name"], self.default_timeout)
+        if not self._slots.acquire(timeout=timeout):
+            return self._timeout_message(request, timeout, started=False)
+        # copy_context keeps the graph's runtime/config visible to the tool
+        future = self._pool.submit(contextvars.copy_context().run, handler, request)
+        # free the slot when the thread is done, not when we stop waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return self._timeout_message(request, timeout)
+
+    async def awrap_tool_call(self, request, handler):
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+        timeout = self.timeouts.get(request.tool_call["name"], self.default_timeout)
+        async with self._async_slots:
+            try:
+                return await asyncio.wait_for(handler(request), timeout)
+            except asyncio.TimeoutError:
+                return self._timeout_message(request, timeout)
+
+
+def parallel_config(max_concurrency: int = 8) -> dict:
+    """Run config letting LangGraph execute up to `max_concurrency` tool tasks per step."""
+    return {"max_concurrency": max_concurrency}
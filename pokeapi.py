@@ -1,9 +1,27 @@
-from langchain.agents import create_agent
-from langchain.tools import tool
-from langchain_ollama import ChatOllama
+import os
 import requests
 
-@tool
+from http_tools import http_session, ttl_cache
+from launcher import Lazy, mark_ready, startup_report, warm_up_ollama
+
+# The agent stack (langchain.agents → LangGraph, langchain_ollama) takes
+# seconds to import, so it is imported and built in the background while
+# the first question is typed; see launcher.py.
+OLLAMA_MODEL = "llama3.1:8b"
+OLLAMA_URL = "http://localhost:11434"
+
+POKEAPI_URL = os.getenv("POKEAPI_URL", "https://pokeapi.co/api/v2")  # stub server for tests
+
+@ttl_cache(ttl=None, maxsize=1024)  # Pokemon data never changes
+def fetch_pokemon(pokemon_name: str) -> dict | None:
+    """Return the PokeAPI record, None if the Pokemon does not exist."""
+    response = http_session().get(f"{POKEAPI_URL}/pokemon/{pokemon_name}", timeout=10)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+# made a LangChain tool in build_agent(), langchain_core alone costs ~0.5s to import
 def pokemon_lookup(pokemon_name: str) -> str:
     """Query the PokeAPI database for Pokemon information.
     
@@ -15,18 +33,16 @@ def pokemon_lookup(pokemon_name: str) -> str:
     """
     try:
         pokemon_name = pokemon_name.lower().strip()
-        url = f"https://pokeapi.co/api/v2/pokemon/{pokemon_name}"
         
         print(f"\n🔍 Searching PokeAPI for: {pokemon_name}")
-        response = requests.get(url, timeout=10)
+        try:
+            data = fetch_pokemon(pokemon_name)
+        except requests.HTTPError as e:
+            return f"ERROR: Database query failed with status {e.response.status_code}"
         
-        if response.status_code == 404:
+        if data is None:
             return f"ERROR: No Pokemon data found for '{pokemon_name}' in the PokeAPI database."
         
-        if response.status_code != 200:
-            return f"ERROR: Database query failed with status {response.status_code}"
-        
-        data = response.json()
         name = data['name'].capitalize()
         height = data['height'] / 10
         weight = data['weight'] / 10
@@ -44,12 +60,18 @@ Abilities: {', '.join(abilities)}"""
     except Exception as e:
         return f"ERROR: {str(e)}"
 
-# Initialize Ollama
-llm = ChatOllama(
-    model="llama3.1:8b",
-    temperature=0.3,
-    base_url="http://localhost:11434"
-)
+def build_llm():
+    from langchain_ollama import ChatOllama
+    from replay import replayable
+
+    # Initialize Ollama (LLM_REPLAY=record|replay swaps in the offline stand-in)
+    return replayable(ChatOllama(
+        model=OLLAMA_MODEL,
+        temperature=0.3,
+        base_url=OLLAMA_URL
+    ), "pokedex")
+
+llm = Lazy(build_llm, "ChatOllama")
 
 # Strict Pokédex system prompt
 strict_system_prompt = """You are a Pokédex - a digital encyclopedia device for Pokemon data.
@@ -68,37 +90,77 @@ RESPONSE FORMAT:
 - If non-Pokemon query: "Error: Query outside Pokédex database scope."
 """
 
-# Create agent WITHOUT verbose parameter
-agent = create_agent(
-    model=llm,
-    tools=[pokemon_lookup],
-    system_prompt=strict_system_prompt
-)
+def build_tracer():
+    from tracing import Tracer
+
+    # Spans for every model and tool call; traces.jsonl + summary on exit
+    return Tracer(jsonl_path="traces.jsonl")
+
+tracer = Lazy(build_tracer, "tracer")
+
+def build_agent():
+    from langchain.agents import create_agent
+    from langchain_core.tools import tool
+    from parallel_tools import ParallelToolMiddleware
+    from prompt_cache import PromptCacheMiddleware
+    from replay import replay_tools
+    from tracing import TracingMiddleware
+
+    # Create agent WITHOUT verbose parameter
+    return create_agent(
+        model=llm.get(),
+        tools=[tool(pokemon_lookup)],
+        system_prompt=strict_system_prompt,
+        middleware=[
+            TracingMiddleware(tracer.get()),
+            PromptCacheMiddleware(keep_alive="30m"),
+            ParallelToolMiddleware(max_concurrency=8, timeouts={"pokemon_lookup": 15}),
+            *replay_tools("pokedex"),
+        ]
+    )
+
+agent = Lazy(build_agent, "pokedex agent")
+
+def new_memory():
+    from conversation_memory import ConversationMemory
+
+    return ConversationMemory(max_tokens=3000, keep_recent_turns=3)
 
 def run_pokedex():
     """Run Pokédex interface"""
+    agent.prefetch()
+    warm_up_ollama(OLLAMA_MODEL, OLLAMA_URL)
     print("🔴 Pokédex System Online")
     print("=" * 60)
-    
-    conversation_history = []
+    memory = Lazy(new_memory, "conversation memory").prefetch()
+    mark_ready()
     
     while True:
         user_input = input("\nTrainer: ").strip()
         
         if user_input.lower() in ['exit', 'quit', 'q']:
             print("Pokédex shutting down...")
+            if tracer.built:
+                tracer.get().flush()
+                tracer.get().print_summary()
+            startup_report()
             break
         
         if not user_input:
             continue
         
         try:
-            conversation_history.append({"role": "user", "content": user_input})
+            memory.get().add_user_message(user_input)
+            sent = memory.get().messages()
             
-            result = agent.invoke({"messages": conversation_history})
+            # get() waits for the background build if the first question is
+            # fast; {"max_concurrency": 8} is parallel_config(8), inlined so
+            # the agent stack is not imported before the prompt is shown
+            result = agent.get().invoke({"messages": sent}, config={"max_concurrency": 8})
             response = result["messages"][-1].content
             
-            conversation_history = result["messages"]
+            # keep only this turn's new messages; memory caps the total size
+            memory.get().add_agent_messages(result["messages"][len(sent):])
             
             print(f"\nPokédex: {response}")
             
@@ -0,0 +1,137 @@
+import time
+from functools import wraps
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+
+
+def cached_prompt(key):
+    """Memoise a dynamic prompt function per context value.
+
+    `key(request)` picks the value the prompt depends on (e.g. the user
+    role); the prompt is built once per distinct key and the very same
+    string is returned afterwards, so the prefix sent to the model stays
+    byte-identical between turns. Stack it under `@dynamic_prompt`:
+
+        @dynamic_prompt
+        @cached_prompt(key=lambda request: request.runtime.context.user_role)
+        def user_role_prompt(request): ...
+    """
+
+    def decorator(fn):
+        cache = {}
+
+        @wraps(fn)
+        def wrapper(request):
+            k = key(request)
+            if k not in cache:
+                cache[k] = fn(request)
+            return cache[k]
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+class PromptCacheMiddleware(AgentMiddleware):
+    """Keep a long, static system prompt cached across agent turns.
+
+    * Ollama (`ChatOllama`): the model reuses the KV cache of an identical
+      prompt prefix as long as it stays loaded, so every call is sent with
+      `keep_alive` to stop the server from unloading it between turns.
+    * Gemini (`ChatGoogleGenerativeAI`): when `gemini_cache_ttl` is set and
+      the system prompt is long enough for explicit caching, the prompt is
+      uploaded once as cached content and later calls reference it instead
+      of resending it. The cache is recreated shortly before its TTL runs
+      out. Gemini rejects tools next to cached content, so calls with tools
+      – and shorter prompts – rely on Gemini's implicit prefix caching,
+      which only needs the prefix to be stable. If creating the cache or a
+      call using it fails, the call is sent uncached and explicit caching
+      is paused for one TTL.
+
+    Add it after any `@dynamic_prompt` middleware so it sees the final
+    system prompt.
+    """
+
+    def __init__(
+        self,
+        keep_alive: str = "30m",
+        gemini_cache_ttl: str | None = None,
+        gemini_min_chars: int = 8000,
+    ):
+        super().__init__()
+        self.keep_alive = keep_alive
+        self.gemini_cache_ttl = gemini_cache_ttl
+        self.gemini_min_chars = gemini_min_chars  # ~2k tokens, Gemini's minimum
+        # (model name, system prompt) -> (cached model or None, monotonic expiry)
+        self._gemini_caches = {}
+
+    def _ttl_seconds(self) -> float:
+        return float(self.gemini_cache_ttl.removesuffix("s"))
+
+    def _gemini_cached_model(self, model, system_prompt: str):
+        key = (model.model, system_prompt)
+        entry = self._gemini_caches.get(key)
+        if entry is not None and time.monotonic() < entry[1]:
+            return entry[0]
+        try:
+            from google import genai
+            from google.genai import types
+
+            cache = genai.Client().caches.create(
+                model=model.model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=system_prompt, ttl=self.gemini_cache_ttl
+                ),
+            )
+            cached_model = model.model_copy(update={"cached_content": cache.name})
+        except Exception as e:
+            print(f"⚠️  Gemini context cache unavailable ({e}) – using implicit caching")
+            cached_model = None
+        # recreate a minute before the server drops it
+        self._gemini_caches[key] = (cached_model, time.monotonic() + max(0.0, self._ttl_seconds() - 60))
+        return cached_model
+
+    def _disable_gemini_cache(self, request: ModelRequest, error: Exception):
+        print(f"⚠️  Gemini cached call failed ({error}) – retrying without the context cache")
+        key = (request.model.model, request.system_prompt)
+        self._gemini_caches[key] = (None, time.monotonic() + self._ttl_seconds())
+
+    def _prepare(self, request: ModelRequest) -> tuple[ModelRequest, ModelRequest | None]:
+        """The request to send (with keep-alive for Ollama) and, when the
+        Gemini context cache applies, a variant using it (else None)."""
+        model = request.model
+        if hasattr(model, "keep_alive"):  # ChatOllama
+            return request.override(
+                model_settings={**request.model_settings, "keep_alive": self.keep_alive}
+            ), None
+        if (
+            hasattr(model, "cached_content")  # ChatGoogleGenerativeAI
+            and self.gemini_cache_ttl
+            and not request.tools
+            and request.system_prompt
+            and len(request.system_prompt) >= self.gemini_min_chars
+        ):
+            cached_model = self._gemini_cached_model(model, request.system_prompt)
+            if cached_model is not None:
+                # the system prompt is already part of the cached content
+                return request, request.override(model=cached_model, system_prompt=None)
+        return request, None
+
+    def wrap_model_call(self, request: ModelRequest, handler) -> ModelResponse:
+        request, cached = self._prepare(request)
+        if cached is not None:
+            try:
+                return handler(cached)
+            except Exception as e:
+                self._disable_gemini_cache(request, e)
+        return handler(request)
+
+    async def awrap_model_call(self, request: ModelRequest, handler) -> ModelResponse:
+        request, cached = self._prepare(request)
+        if cached is not None:
+            try:
+                return await handler(cached)
+            except Exception as e:
+                self._disable_gemini_cache(request, e)
+        return await handler(request)
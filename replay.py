@@ -0,0 +1,345 @@
+import asyncio
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, ToolMessage, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain.agents.middleware import AgentMiddleware
+
+
+class Cassette:
+    """Recorded model, embedding and tool calls in one gzipped JSONL file.
+
+    Each line is {"k": request key, "v": recorded value}; keys are sha256
+    digests of the normalised request, so secrets in prompts are not
+    needed to look a recording up (they are still in the values).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with gzip.open(path, "rt") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.entries[entry["k"]] = entry["v"]
+
+    @staticmethod
+    def key(*parts) -> str:
+        blob = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+    def get(self, key: str):
+        value = self.entries.get(key)
+        if value is None:
+            raise KeyError(f"no recording for request {key} in {self.path} – re-record it")
+        return value
+
+    def put(self, key: str, value):
+        with self._lock:
+            self.entries[key] = value
+            self.dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory)
+            with gzip.open(os.fdopen(fd, "wb"), "wt") as f:
+                for key, value in self.entries.items():
+                    f.write(json.dumps({"k": key, "v": value}, separators=(",", ":")) + "\n")
+            os.replace(tmp, self.path)
+            self.dirty = False
+
+
+def request_key(messages, tools) -> str:
+    """Key on what the model sees: roles, text, tool calls and bound tools.
+
+    Message and tool-call ids are left out, so a conversation replays even
+    though ids differ between runs.
+    """
+    normalised = []
+    for message in messages:
+        normalised.append(
+            [
+                message.type,
+                message.content,
+                [[call["name"], call["args"]] for call in getattr(message, "tool_calls", [])],
+            ]
+        )
+    return Cassette.key("chat", normalised, sorted(tools))
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat-model stand-in that records a real model's responses or replays them.
+
+    Record mode (`inner` set): every call is streamed from `inner` and its
+    chunks – text, tool-call chunks, usage – are stored with their timing.
+    Replay mode: the chunks are played back with no network, with
+    `ttft` seconds before the first chunk and `token_latency` between
+    chunks; when those are None the recorded timings are used, scaled by
+    `time_scale` (0 replays instantly).
+
+    `simulated_seconds` adds up the latency injected so far, so a load test
+    can subtract it and keep only the framework's own overhead.
+    """
+
+    cassette: Any
+    inner: Any = None
+    bound: Any = None  # inner with tools bound, in record mode
+    tools: list[str] = []
+    ttft: float | None = None
+    token_latency: float | None = None
+    time_scale: float = 1.0
+    simulated_seconds: list[float] = [0.0]  # shared between bind_tools copies
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools, **kwargs):
+        names = [convert_to_openai_tool(tool)["function"]["name"] for tool in tools]
+        bound = self.inner.bind_tools(tools, **kwargs) if self.inner is not None else None
+        return self.model_copy(update={"tools": names, "bound": bound})
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def _record(self, messages, chunks, times, start):
+        self.cassette.put(
+            request_key(messages, self.tools),
+            {
+                "chunks": [
+                    {
+                        "c": chunk.content,
+                        "t": chunk.tool_call_chunks,
+                        "u": chunk.usage_metadata,
+                    }
+                    for chunk in chunks
+                ],
+                "ttft": times[0] - start if times else 0.0,
+                "gaps": [round(b - a, 4) for a, b in zip(times, times[1:])],
+            },
+        )
+
+    def _record_stream(self, messages, **kwargs):
+        model = self.bound or self.inner
+        chunks, times, start = [], [], time.perf_counter()
+        for chunk in model.stream(messages, **kwargs):
+            times.append(time.perf_counter())
+            chunks.append(chunk)
+            yield chunk
+        self._record(messages, chunks, times, start)
+
+    async def _arecord_stream(self, messages, **kwargs):
+        model = self.bound or self.inner
+        chunks, times, start = [], [], time.perf_counter()
+        async for chunk in model.astream(messages, **kwargs):
+            times.append(time.perf_counter())
+            chunks.append(chunk)
+            yield chunk
+        self._record(messages, chunks, times, start)
+
+    # ------------------------------------------------------------------
+    # Replay
+    # ------------------------------------------------------------------
+    def _delays(self, recording) -> list[float]:
+        n = len(recording["chunks"])
+        if self.ttft is not None or self.token_latency is not None:
+            return [self.ttft or 0.0] + [self.token_latency or 0.0] * (n - 1)
+        return [recording["ttft"] * self.time_scale] + [
+            gap * self.time_scale for gap in recording["gaps"]
+        ]
+
+    @staticmethod
+    def _chunk(data) -> AIMessageChunk:
+        return AIMessageChunk(
+            content=data["c"], tool_call_chunks=data["t"] or [], usage_metadata=data["u"]
+        )
+
+    def _replay(self, messages):
+        recording = self.cassette.get(request_key(messages, self.tools))
+        delays = self._delays(recording)
+        self.simulated_seconds[0] += sum(delays)
+        return recording, delays
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.inner is not None:
+            for chunk in self._record_stream(messages, stop=stop, **kwargs):
+                yield ChatGenerationChunk(message=chunk)
+            return
+        recording, delays = self._replay(messages)
+        for data, delay in zip(recording["chunks"], delays):
+            if delay:
+                time.sleep(delay)
+            chunk = self._chunk(data)
+            if run_manager and chunk.content:
+                run_manager.on_llm_new_token(chunk.content)
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.inner is not None:
+            async for chunk in self._arecord_stream(messages, stop=stop, **kwargs):
+                yield ChatGenerationChunk(message=chunk)
+            return
+        recording, delays = self._replay(messages)
+        for data, delay in zip(recording["chunks"], delays):
+            if delay:
+                await asyncio.sleep(delay)
+            chunk = self._chunk(data)
+            if run_manager and chunk.content:
+                await run_manager.on_llm_new_token(chunk.content)
+            yield ChatGenerationChunk(message=chunk)
+
+    @staticmethod
+    def _merge(chunks) -> ChatResult:
+        merged = chunks[0].message
+        for chunk in chunks[1:]:
+            merged = merged + chunk.message
+        return ChatResult(generations=[ChatGeneration(message=message_chunk_to_message(merged))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self._merge(list(self._stream(messages, stop, run_manager, **kwargs)))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self._merge([chunk async for chunk in self._astream(messages, stop, run_manager, **kwargs)])
+
+
+class ReplayEmbeddings(Embeddings):
+    """Embedding stand-in: records `inner`'s vectors (stored as base64
+    float32) or replays them, sleeping `latency` seconds per call."""
+
+    def __init__(self, cassette: Cassette, inner: Embeddings | None = None, latency: float = 0.0):
+        self.cassette = cassette
+        self.inner = inner
+        self.latency = latency
+
+    @staticmethod
+    def _encode(vector) -> str:
+        return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode()
+
+    @staticmethod
+    def _decode(blob: str) -> list[float]:
+        return np.frombuffer(base64.b64decode(blob), dtype=np.float32).tolist()
+
+    def _lookup(self, kind: str, texts: list[str], embed) -> list[list[float]]:
+        keys = [Cassette.key(kind, text) for text in texts]
+        if self.inner is not None:
+            vectors = embed(texts)
+            for key, vector in zip(keys, vectors):
+                self.cassette.put(key, self._encode(vector))
+            return vectors
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._decode(self.cassette.get(key)) for key in keys]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        embed = self.inner.embed_documents if self.inner is not None else None
+        return self._lookup("document", texts, embed)
+
+    def embed_query(self, text: str) -> list[float]:
+        embed = (lambda texts: [self.inner.embed_query(texts[0])]) if self.inner is not None else None
+        return self._lookup("query", [text], embed)[0]
+
+
+class ReplayToolMiddleware(AgentMiddleware):
+    """Record tool results, or replay them without running the tool.
+
+    Put it last in the middleware list so the other tool middlewares
+    (timeouts, tracing) still wrap the replayed call.
+    """
+
+    def __init__(self, cassette: Cassette, record: bool = False, latency: float = 0.0):
+        super().__init__()
+        self.cassette = cassette
+        self.record = record
+        self.latency = latency
+
+    @staticmethod
+    def _key(request) -> str:
+        return Cassette.key("tool", request.tool_call["name"], request.tool_call["args"])
+
+    def _message(self, request, content) -> ToolMessage:
+        return ToolMessage(
+            content=content, tool_call_id=request.tool_call["id"], name=request.tool_call["name"]
+        )
+
+    def wrap_tool_call(self, request, handler):
+        if self.record:
+            result = handler(request)
+            self.cassette.put(self._key(request), result.content)
+            return result
+        if self.latency:
+            time.sleep(self.latency)
+        return self._message(request, self.cassette.get(self._key(request)))
+
+    async def awrap_tool_call(self, request, handler):
+        if self.record:
+            result = await handler(request)
+            self.cassette.put(self._key(request), result.content)
+            return result
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._message(request, self.cassette.get(self._key(request)))
+
+
+_cassettes: dict[str, Cassette] = {}
+
+
+def _mode_cassette(name: str):
+    mode = os.getenv("LLM_REPLAY")
+    if mode not in ("record", "replay"):
+        return None, None
+    path = os.path.join(os.getenv("LLM_CASSETTE_DIR", "cassettes"), f"{name}.jsonl.gz")
+    if not _cassettes:
+        atexit.register(save_cassettes)
+    if path not in _cassettes:
+        _cassettes[path] = Cassette(path)
+    return mode, _cassettes[path]
+
+
+def replayable(model, name: str):
+    """Return `model`, or a record/replay stand-in for it when the
+    LLM_REPLAY environment variable is "record" or "replay".
+
+    Recordings go to $LLM_CASSETTE_DIR/<name>.jsonl.gz (default
+    ./cassettes) and are saved at exit. Works for chat models and
+    embeddings.
+    """
+    mode, cassette = _mode_cassette(name)
+    if mode is None:
+        return model
+    inner = model if mode == "record" else None
+    if isinstance(model, Embeddings):
+        return ReplayEmbeddings(cassette, inner=inner)
+    return ReplayChatModel(cassette=cassette, inner=inner)
+
+
+def replay_tools(name: str) -> list:
+    """Middleware list recording / replaying tool results under LLM_REPLAY,
+    empty otherwise – spread it at the end of `middleware=[...]`."""
+    mode, cassette = _mode_cassette(name)
+    if mode is None:
+        return []
+    return [ReplayToolMiddleware(cassette, record=mode == "record")]
+
+
+def save_cassettes():
+    for cassette in _cassettes.values():
+        cassette.save()
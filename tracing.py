@@ -0,0 +1,401 @@
+import contextvars
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.callbacks import BaseCallbackHandler
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# (trace id, sampled for JSONL, name of the enclosing span)
+_current = contextvars.ContextVar("trace_span", default=None)
+_trace_ids = itertools.count(1)
+_TRACE_PREFIX = f"{os.getpid():x}-{random.getrandbits(24):06x}-"
+
+
+def new_trace_id() -> str:
+    # cheaper than uuid4 and unique across processes writing the same file
+    return f"{_TRACE_PREFIX}{next(_trace_ids):x}"
+
+
+class StageStats:
+    """Prometheus-style histogram plus a window of recent durations for percentiles."""
+
+    def __init__(self, window: int = 1000):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last one is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.tokens = Counter()
+        self.recent = deque(maxlen=window)
+
+    def record(self, duration: float, error: bool, tokens: dict):
+        self.buckets[bisect_left(BUCKETS, duration)] += 1
+        self.count += 1
+        self.total += duration
+        self.errors += error
+        self.recent.append(duration)
+        for kind, n in tokens.items():
+            self.tokens[kind] += n
+
+    def percentile(self, q: float) -> float | None:
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack every `interval` seconds.
+
+    Stacks are counted in collapsed "outer;inner;leaf" form, the input
+    format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+class Tracer:
+    """Per-stage latency spans with token counts.
+
+    Every span updates an in-memory histogram for its stage name; they are
+    exported in Prometheus text format by `render_prometheus()` / `serve()`.
+    With `jsonl_path`, spans are also buffered and appended there as JSONL
+    (one line per span, with trace id and parent stage), for `sample_rate`
+    of the traces.
+
+    Stages named in `profile_stages` run under a sampling profiler; the
+    collapsed stacks are written by `write_profile()`.
+
+    A span costs a few microseconds; the time spent in bookkeeping is
+    tracked in `overhead` so it can be checked against the traced time.
+    """
+
+    def __init__(
+        self,
+        jsonl_path: str | None = None,
+        sample_rate: float = 1.0,
+        profile_stages=(),
+        profile_interval: float = 0.005,
+        flush_every: int = 64,
+    ):
+        self.jsonl_path = jsonl_path
+        self.sample_rate = sample_rate
+        self.profile_stages = set(profile_stages)
+        self.profile_interval = profile_interval
+        self.flush_every = flush_every
+        self.stages: dict[str, StageStats] = {}
+        self.profile = Counter()
+        self.overhead = 0.0
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def record(self, name: str, duration: float, error: bool = False, parent=None, **attrs):
+        """Record a finished stage; `attrs` ending in "_tokens" feed the token counters."""
+        start = time.perf_counter()
+        parent = parent if parent is not None else _current.get()
+        tokens = {k: v for k, v in attrs.items() if v and k.endswith("_tokens")} if attrs else {}
+        line = None
+        if self.jsonl_path and (parent[1] if parent else self._sampled()):
+            line = {
+                "trace": parent[0] if parent else new_trace_id(),
+                "stage": name,
+                "parent": parent[2] if parent else None,
+                "end": round(time.time(), 6),
+                "duration_s": round(duration, 6),
+                "error": error,
+                **attrs,
+            }
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats()
+            stats.record(duration, error, tokens)
+            if line is not None:
+                self._buffer.append(line)
+                if len(self._buffer) >= self.flush_every:
+                    self._flush_locked()
+            self.overhead += time.perf_counter() - start
+
+    def span(self, name: str, **attrs) -> "_Span":
+        """Time a `with` block as stage `name`. The block gets a dict for
+        extra attributes (e.g. token counts) to attach before the span ends."""
+        return _Span(self, name, attrs)
+
+    def _sampled(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+    def _flush_locked(self):
+        if self._buffer:
+            with open(self.jsonl_path, "a") as f:
+                f.write("".join(json.dumps(line, default=str) + "\n" for line in self._buffer))
+            self._buffer = []
+
+    def flush(self):
+        with self._lock:
+            if self.jsonl_path:
+                self._flush_locked()
+
+    def write_profile(self, path: str = "profile.folded"):
+        with self._lock:
+            with open(path, "w") as f:
+                for stack, count in self.profile.most_common():
+                    f.write(f"{stack} {count}\n")
+
+    def summary(self) -> dict:
+        with self._lock:
+            report = {
+                name: {
+                    "count": stats.count,
+                    "mean_s": stats.total / stats.count,
+                    "p50_s": stats.percentile(0.5),
+                    "p95_s": stats.percentile(0.95),
+                    "errors": stats.errors,
+                    **stats.tokens,
+                }
+                for name, stats in sorted(self.stages.items())
+            }
+            traced = sum(stats.total for stats in self.stages.values())
+        report["_overhead"] = {
+            "seconds": self.overhead,
+            "fraction_of_traced": self.overhead / traced if traced else 0.0,
+        }
+        return report
+
+    def print_summary(self):
+        print("\n⏱️  Stage latencies")
+        for name, row in self.summary().items():
+            if name == "_overhead":
+                print(f"   tracing overhead: {row['fraction_of_traced']:.3%} of traced time")
+                continue
+            tokens = "  ".join(f"{k}={v}" for k, v in row.items() if k.endswith("_tokens"))
+            print(
+                f"   {name:<24} n={row['count']:<5} p50={row['p50_s']:.3f}s "
+                f"p95={row['p95_s']:.3f}s  {tokens}"
+            )
+
+    def render_prometheus(self, prefix: str = "llm_stage") -> str:
+        lines = [
+            f"# HELP {prefix}_seconds Latency per pipeline stage",
+            f"# TYPE {prefix}_seconds histogram",
+        ]
+        token_lines = [f"# TYPE {prefix}_tokens_total counter"]
+        with self._lock:
+            for name, stats in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, n in zip(BUCKETS + ("+Inf",), stats.buckets):
+                    cumulative += n
+                    lines.append(f'{prefix}_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_seconds_sum{{stage="{name}"}} {stats.total}')
+                lines.append(f'{prefix}_seconds_count{{stage="{name}"}} {stats.count}')
+                for kind, n in sorted(stats.tokens.items()):
+                    token_lines.append(f'{prefix}_tokens_total{{stage="{name}",kind="{kind}"}} {n}')
+        return "\n".join(lines + token_lines) + "\n"
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve `/metrics` for Prometheus from a daemon thread."""
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = tracer.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"📈 Metrics on http://{host}:{port}/metrics")
+        return server
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "attrs", "parent", "context", "token", "profiler", "start")
+
+    def __init__(self, tracer: Tracer, name: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self) -> dict:
+        tracer = self.tracer
+        self.parent = parent = _current.get()
+        if parent is None:
+            self.context = (new_trace_id(), tracer._sampled(), self.name)
+        else:
+            self.context = (parent[0], parent[1], self.name)
+        self.token = _current.set(self.context)
+        self.profiler = None
+        if self.name in tracer.profile_stages:
+            self.profiler = SamplingProfiler(threading.get_ident(), tracer.profile_interval).start()
+        self.start = time.perf_counter()
+        return self.attrs
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        tracer = self.tracer
+        _current.reset(self.token)
+        if self.profiler is not None:
+            stacks = self.profiler.stop()
+            with tracer._lock:
+                tracer.profile.update(stacks)
+        parent = self.parent or (self.context[0], self.context[1], None)
+        tracer.record(self.name, duration, exc_type is not None, parent=parent, **self.attrs)
+        return False
+
+
+def usage_tokens(message) -> dict:
+    usage = getattr(message, "usage_metadata", None) or {}
+    return {
+        "input_tokens": usage.get("input_tokens", 0),
+        "output_tokens": usage.get("output_tokens", 0),
+    }
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Stage spans for LCEL chains from LangChain callbacks.
+
+    Pass it as `config={"callbacks": [handler]}`. Records:
+      llm / llm.ttft / llm.generation – model call, time to first streamed
+                                        token, and the rest of generation;
+      retrieve                        – the whole retriever call (HybridRetriever
+                                        also records embed_query and search);
+      chain stages named in `chain_stages`, e.g. the prompt template.
+    """
+
+    def __init__(self, tracer: Tracer, chain_stages: dict[str, str] | None = None):
+        self.tracer = tracer
+        self.chain_stages = chain_stages or {"ChatPromptTemplate": "prompt_build"}
+        self._runs = {}  # run_id -> (stage, start, first token time or None, parent)
+
+    def _start(self, run_id, stage):
+        self._runs[run_id] = [stage, time.perf_counter(), None, _current.get()]
+
+    def _end(self, run_id, error=False, **attrs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return None
+        stage, start, first_token, parent = run
+        end = time.perf_counter()
+        self.tracer.record(stage, end - start, error, parent=parent, **attrs)
+        return start, first_token, end, parent
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm")
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is not None and run[2] is None:
+            run[2] = time.perf_counter()
+            self.tracer.record("llm.ttft", run[2] - run[1], parent=run[3])
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        tokens = {}
+        try:
+            tokens = usage_tokens(response.generations[0][0].message)
+        except (AttributeError, IndexError):
+            pass
+        timing = self._end(run_id, **tokens)
+        if timing and timing[1] is not None:
+            start, first_token, end, parent = timing
+            self.tracer.record("llm.generation", end - first_token, parent=parent)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id, "retrieve")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id, documents=len(documents))
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, **kwargs):
+        stage = self.chain_stages.get(kwargs.get("name"))
+        if stage:
+            self._start(run_id, stage)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+
+
+class TracingMiddleware(AgentMiddleware):
+    """Spans for every model call ("model", with token counts) and tool call
+    ("tool:<name>") of a `create_agent` agent. Put it first in the
+    middleware list so the spans include the other middlewares' time."""
+
+    def __init__(self, tracer: Tracer):
+        super().__init__()
+        self.tracer = tracer
+
+    def wrap_model_call(self, request, handler):
+        with self.tracer.span("model") as attrs:
+            response = handler(request)
+            attrs.update(usage_tokens(response.result[-1]))
+            return response
+
+    async def awrap_model_call(self, request, handler):
+        with self.tracer.span("model") as attrs:
+            response = await handler(request)
+            attrs.update(usage_tokens(response.result[-1]))
+            return response
+
+    def wrap_tool_call(self, request, handler):
+        with self.tracer.span(f"tool:{request.tool_call['name']}"):
+            return handler(request)
+
+    async def awrap_tool_call(self, request, handler):
+        with self.tracer.span(f"tool:{request.tool_call['name']}"):
+            return await handler(request)
@@ -0,0 +1,397 @@
+import copy
+import os
+from dataclasses import dataclass
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+
+@dataclass
+class IndexConfig:
+    """Which FAISS index backs a LangChain FAISS store.
+
+    kind:
+        "flat" – exact search, the LangChain default;
+        "ivf"  – inverted file over a trained k-means quantizer, searches
+                 `nprobe` of `nlist` cells;
+        "hnsw" – graph index, `ef_search` controls recall vs speed;
+        "pq"   – IVF with product-quantized vectors (`pq_m` bytes per
+                 vector), the option for corpora that must fit in memory.
+
+    IVF and PQ need training data, so a store starts flat and is converted
+    automatically once it holds `train_min` vectors.
+    """
+
+    kind: str = "flat"
+    nlist: int | None = None  # IVF cells, default 4 * sqrt(n)
+    nprobe: int = 16
+    hnsw_m: int = 32
+    ef_search: int = 64
+    pq_m: int = 16  # must divide the embedding dimension
+    train_min: int = 10_000
+    train_sample: int = 100_000
+
+    def key(self) -> str:
+        """Short string identifying the index layout, for cache keys."""
+        return f"{self.kind}:{self.nlist}:{self.hnsw_m}:{self.pq_m}"
+
+
+def factory_spec(config: IndexConfig, n: int) -> str:
+    nlist = config.nlist or max(1, int(4 * np.sqrt(n)))
+    return {
+        "flat": "Flat",
+        "ivf": f"IVF{nlist},Flat",
+        "hnsw": f"HNSW{config.hnsw_m}",
+        "pq": f"IVF{nlist},PQ{config.pq_m}",
+    }[config.kind]
+
+
+def is_flat(index) -> bool:
+    return isinstance(index, faiss.IndexFlat)
+
+
+def is_hnsw(index) -> bool:
+    return isinstance(index, faiss.IndexHNSW)
+
+
+class _FilteredIndex:
+    """Index view whose `search` skips the given labels; everything else
+    is delegated to the real index."""
+
+    def __init__(self, index, params):
+        self._index = index
+        self._params = params
+
+    def search(self, x, k):
+        return self._index.search(x, k, params=self._params)
+
+    def __getattr__(self, name):
+        return getattr(self._index, name)
+
+
+class _LabelledAddIndex:
+    """Index view whose `add` passes the labels ntotal, ntotal+1, … explicitly.
+
+    IVF's hashtable direct map only learns ids given to add_with_ids; with
+    a plain add() the new vectors could not be reconstructed or removed.
+    """
+
+    def __init__(self, index):
+        self._index = index
+
+    def add(self, x):
+        start = self._index.ntotal
+        self._index.add_with_ids(x, np.arange(start, start + len(x), dtype=np.int64))
+
+    def __getattr__(self, name):
+        return getattr(self._index, name)
+
+
+class DeletableFAISS(FAISS):
+    """LangChain FAISS store whose documents can be deleted cheaply from
+    every index type (see `delete_ids`).
+
+    LangChain numbers vectors 0..n-1 by position, so labels must stay
+    dense. HNSW graphs cannot drop nodes: their deleted positions become
+    tombstones that searches skip through an IDSelector, until
+    `compact_index()` rebuilds the graph. Tombstones are saved next to
+    index.faiss. Vectors added to an IVF / PQ index get explicit labels,
+    so its direct map can find them again for deletion.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tombstones = set()
+        self._selector = None  # (IDSelectorBatch, IDSelectorNot), kept alive together
+
+    def add_tombstones(self, labels):
+        self.tombstones.update(labels)
+        self._selector = None
+
+    def live_ids(self) -> list[str]:
+        return [
+            doc_id
+            for label, doc_id in self.index_to_docstore_id.items()
+            if label not in self.tombstones
+        ]
+
+    def search_params(self):
+        """faiss search parameters hiding the tombstones, or None."""
+        if not self.tombstones:
+            return None
+        if self._selector is None:
+            batch = faiss.IDSelectorBatch(np.fromiter(self.tombstones, dtype=np.int64))
+            self._selector = (batch, faiss.IDSelectorNot(batch))
+        return faiss.SearchParametersHNSW(sel=self._selector[1], efSearch=self.index.hnsw.efSearch)
+
+    def _filtered(self) -> "DeletableFAISS":
+        params = self.search_params()
+        if params is None:
+            return self
+        view = copy.copy(self)  # shallow: same index, docstore and mapping
+        view.index = _FilteredIndex(self.index, params)
+        return view
+
+    def _labelled(self) -> "DeletableFAISS":
+        if is_flat(self.index) or is_hnsw(self.index):
+            return self
+        view = copy.copy(self)  # shallow: adds land in the same index, docstore and mapping
+        view.index = _LabelledAddIndex(self.index)
+        return view
+
+    def add_texts(self, *args, **kwargs):
+        return FAISS.add_texts(self._labelled(), *args, **kwargs)
+
+    async def aadd_texts(self, *args, **kwargs):
+        return await FAISS.aadd_texts(self._labelled(), *args, **kwargs)
+
+    def add_embeddings(self, *args, **kwargs):
+        return FAISS.add_embeddings(self._labelled(), *args, **kwargs)
+
+    def similarity_search_with_score_by_vector(self, *args, **kwargs):
+        return FAISS.similarity_search_with_score_by_vector(self._filtered(), *args, **kwargs)
+
+    def max_marginal_relevance_search_with_score_by_vector(self, *args, **kwargs):
+        return FAISS.max_marginal_relevance_search_with_score_by_vector(
+            self._filtered(), *args, **kwargs
+        )
+
+    def save_local(self, folder_path: str, index_name: str = "index") -> None:
+        super().save_local(folder_path, index_name)
+        if self.tombstones:
+            np.save(
+                os.path.join(folder_path, f"{index_name}.tombstones.npy"),
+                np.array(sorted(self.tombstones), dtype=np.int64),
+            )
+
+    @classmethod
+    def load_local(cls, folder_path: str, embeddings, index_name: str = "index", **kwargs):
+        store = super().load_local(folder_path, embeddings, index_name=index_name, **kwargs)
+        path = os.path.join(folder_path, f"{index_name}.tombstones.npy")
+        if os.path.isfile(path):
+            store.add_tombstones(np.load(path).tolist())
+        return store
+
+
+def apply_search_params(store: FAISS, config: IndexConfig):
+    index = store.index
+    if config.kind in ("ivf", "pq") and not is_flat(index):
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = config.nprobe
+        # label -> list lookup, needed by reconstruct() and remove_ids() in
+        # delete_ids; rebuilt from the inverted lists, so labels an older
+        # index added without the map are found too
+        ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+    elif config.kind == "hnsw" and not is_flat(index):
+        index.hnsw.efSearch = config.ef_search
+
+
+def ensure_index(store: FAISS, config: IndexConfig) -> bool:
+    """Convert a flat store to the configured index type once it is large enough.
+
+    Returns True when the index was converted. Positions are kept, so the
+    store's index → docstore mapping stays valid.
+    """
+    index = store.index
+    n = index.ntotal
+    if config.kind == "flat" or not is_flat(index):
+        return False
+    if config.kind in ("ivf", "pq") and n < config.train_min:
+        return False
+
+    vectors = index.reconstruct_n(0, n)
+    new_index = faiss.index_factory(index.d, factory_spec(config, n), index.metric_type)
+    if not new_index.is_trained:
+        sample = vectors
+        if n > config.train_sample:
+            sample = vectors[np.random.default_rng(0).choice(n, config.train_sample, replace=False)]
+        print(f"🏋️  Training {factory_spec(config, n)} index on {len(sample):,} vectors…")
+        new_index.train(sample)
+    new_index.add(vectors)
+    store.index = new_index
+    apply_search_params(store, config)
+    return True
+
+
+def build_vectorstore(texts, embeddings, config: IndexConfig, **kwargs) -> DeletableFAISS:
+    """`FAISS.from_texts` with the configured index type."""
+    store = DeletableFAISS.from_texts(texts, embeddings, **kwargs)
+    ensure_index(store, config)
+    return store
+
+
+def delete_ids(store: FAISS, ids: list[str]):
+    """Delete documents by id without rebuilding the index.
+
+    * flat: `FAISS.delete` – `remove_ids` shifts later vectors down and
+      LangChain renumbers its mapping;
+    * IVF / PQ: the doomed labels are removed through the direct map and
+      the same number of vectors from the end of the index are moved into
+      the holes, so labels stay 0..n-1. Only those moved vectors are
+      reconstructed (PQ ones approximately);
+    * HNSW (`DeletableFAISS` only): the labels become tombstones.
+    """
+    if is_flat(store.index):
+        store.delete(ids)
+        return
+    doomed = set(ids)
+    tombstones = getattr(store, "tombstones", set())
+    labels = [
+        label
+        for label, doc_id in store.index_to_docstore_id.items()
+        if doc_id in doomed and label not in tombstones
+    ]
+    if is_hnsw(store.index):
+        if not isinstance(store, DeletableFAISS):
+            raise TypeError("HNSW indexes cannot remove vectors – use DeletableFAISS")
+        store.add_tombstones(labels)
+    elif labels:
+        _move_tail_into_holes(store, labels)
+    store.docstore.delete(list(doomed))
+
+
+def _move_tail_into_holes(store: FAISS, labels: list[int]):
+    index = store.index
+    ivf = faiss.extract_index_ivf(index)
+    if ivf.direct_map.type != faiss.DirectMap.Hashtable:
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+    n, holes = index.ntotal, sorted(labels)
+    cut = n - len(holes)
+    doomed = set(holes)
+    tail = np.array([label for label in range(cut, n) if label not in doomed], dtype=np.int64)
+    targets = np.array([label for label in holes if label < cut], dtype=np.int64)
+    vectors = index.reconstruct_batch(tail) if len(tail) else None
+    index.remove_ids(faiss.IDSelectorArray(np.concatenate([np.array(holes, dtype=np.int64), tail])))
+    if vectors is not None:
+        index.add_with_ids(vectors, targets)
+    mapping = store.index_to_docstore_id
+    for target, label in zip(targets.tolist(), tail.tolist()):
+        mapping[target] = mapping[label]
+    for label in range(cut, n):
+        del mapping[label]
+
+
+def compact_index(store: DeletableFAISS, batch_size: int = 65536) -> int:
+    """Rebuild an HNSW index without its tombstones; returns how many were dropped.
+
+    Reconstructs every live vector (in batches) and rebuilds the graph, so
+    run it explicitly – never on the incremental indexing path.
+    """
+    if not getattr(store, "tombstones", None):
+        return 0
+    keep = [
+        (label, doc_id)
+        for label, doc_id in sorted(store.index_to_docstore_id.items())
+        if label not in store.tombstones
+    ]
+    positions = np.array([label for label, _ in keep], dtype=np.int64)
+    new_index = faiss.clone_index(store.index)
+    new_index.reset()
+    for start in range(0, len(positions), batch_size):
+        new_index.add(store.index.reconstruct_batch(positions[start : start + batch_size]))
+    dropped = len(store.tombstones)
+    store.index = new_index
+    store.index_to_docstore_id = {i: doc_id for i, (_, doc_id) in enumerate(keep)}
+    store.tombstones = set()
+    store._selector = None
+    return dropped
+
+
+def batch_search(store: FAISS, queries: list[str], k: int = 3) -> list[list[Document]]:
+    """Retrieve `k` documents for each query with one embedding call and one
+    vectorised FAISS search over all of them."""
+    embeddings = store.embeddings
+    if hasattr(embeddings, "embed_queries"):
+        vectors = embeddings.embed_queries(queries)
+    else:
+        vectors = [embeddings.embed_query(query) for query in queries]
+    params = store.search_params() if isinstance(store, DeletableFAISS) else None
+    _, positions = store.index.search(np.asarray(vectors, dtype=np.float32), k, params=params)
+    results = []
+    for row in positions:
+        docs = []
+        for position in row:
+            if position == -1:  # fewer than k vectors in the index
+                continue
+            docs.append(store.docstore.search(store.index_to_docstore_id[position]))
+        results.append(docs)
+    return results
+
+
+def check_deletes(kind: str, n: int = 3000, dim: int = 64):
+    """add → delete → save/load → add → delete on one index type, checking
+    after every step that each label still holds its own document's vector
+    and that deleted chunks are never returned."""
+    import tempfile
+
+    from bench_retrieval import HashingEmbeddings, synthetic_corpus
+
+    embeddings = HashingEmbeddings(dim)
+    texts = synthetic_corpus(2 * n, seed=7)
+    config = IndexConfig(kind=kind, train_min=n // 2, nlist=32, pq_m=8)
+    deleted = set()
+
+    def add(store, start, stop):
+        for batch in range(start, stop, 500):  # batches, like index_files()
+            ids = [f"id{i}" for i in range(batch, min(batch + 500, stop))]
+            chunk = texts[batch : batch + len(ids)]
+            if store is None:
+                store = DeletableFAISS.from_texts(chunk, embeddings, ids=ids)
+            else:
+                store.add_texts(chunk, ids=ids)
+            ensure_index(store, config)
+        return store
+
+    def delete(store, ids):
+        ids = [doc_id for doc_id in ids if doc_id not in deleted]
+        delete_ids(store, ids)
+        deleted.update(ids)
+
+    def verify(store, step):
+        live = store.live_ids()
+        assert not deleted & set(live), f"{kind}/{step}: deleted id still indexed"
+        if not is_hnsw(store.index):
+            assert sorted(store.index_to_docstore_id) == list(range(store.index.ntotal))
+            stored = store.index.reconstruct_n(0, store.index.ntotal)
+            mapping = store.index_to_docstore_id
+            expected = embeddings.embed_matrix(
+                [store.docstore.search(mapping[label]).page_content for label in range(len(stored))]
+            )
+            if kind == "pq":  # lossy codes: each label must still be nearest its own document
+                own = np.argmax(stored @ expected.T, axis=1) == np.arange(len(stored))
+                assert own.mean() > 0.9, f"{kind}/{step}: labels hold wrong vectors"
+            else:
+                assert np.abs(stored - expected).max() < 1e-5, f"{kind}/{step}: labels hold wrong vectors"
+        for query in texts[:: max(1, n // 20)]:
+            for doc in store.similarity_search(query, k=5):
+                assert doc.id not in deleted, f"{kind}/{step}: search returned deleted {doc.id}"
+        print(f"   {kind:4s} {step:8s} ✅ {len(live)} live chunks")
+
+    store = add(None, 0, n)
+    verify(store, "add")
+    delete(store, [f"id{i}" for i in range(0, n, 7)] + [f"id{n - 1}"])
+    verify(store, "delete")
+    with tempfile.TemporaryDirectory() as directory:
+        store.save_local(directory)
+        store = DeletableFAISS.load_local(directory, embeddings, allow_dangerous_deserialization=True)
+    apply_search_params(store, config)
+    verify(store, "reload")
+    store = add(store, n, 2 * n)
+    verify(store, "add")
+    delete(store, [f"id{i}" for i in range(3, 2 * n, 5)])
+    verify(store, "delete")
+    if is_hnsw(store.index):
+        compact_index(store)
+        verify(store, "compact")
+
+
+def main():
+    for kind in ("flat", "ivf", "pq", "hnsw"):
+        check_deletes(kind)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# --------------------------------------------------
+# wttr.in client shared by the weather agents (main.py, main2.py)
+# --------------------------------------------------
+# One cached fetch function, so both agents share the pooled session and
+# the 10-minute cache. Point WTTR_URL at a stub server for tests; running
+# this file checks the cache against one:
+#
+#   python weather.py
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from http_tools import http_session, ttl_cache
+
+
+def wttr_url() -> str:
+    # read per call, so a WTTR_URL from .env (load_dotenv) is picked up
+    return os.getenv("WTTR_URL", "https://wttr.in")
+
+
+@ttl_cache(ttl=600, maxsize=128)  # weather is fresh enough for 10 minutes
+def fetch_weather(city: str) -> dict:
+    response = http_session().get(f"{wttr_url()}/{city}?format=j1", timeout=10)
+    response.raise_for_status()  # Raise an error for bad responses (4xx, 5xx)
+    return response.json()
+
+
+def stub_server(delay: float = 0.2):
+    """Local wttr.in stand-in on a free port; returns (server, hit counter)."""
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            time.sleep(delay)  # slow enough for concurrent calls to overlap
+            body = json.dumps({"current_condition": [{"temp_C": "31"}], "path": self.path}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, hits
+
+
+def main():
+    server, hits = stub_server()
+    os.environ["WTTR_URL"] = f"http://127.0.0.1:{server.server_port}"
+    fetch_weather.cache.clear()
+    fetch_weather.cache.ttl = 0.5
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(fetch_weather, ["mangaluru"] * 8))
+        assert all(r == results[0] for r in results)
+        assert len(hits) == 1, f"8 concurrent calls made {len(hits)} requests, expected 1"
+        print("✅ in-flight de-duplication: 8 concurrent calls → 1 request")
+
+        fetch_weather("mangaluru")
+        assert len(hits) == 1, "cached call reached the server"
+        fetch_weather("bengaluru")
+        assert len(hits) == 2, "a different city must not share the cache entry"
+        print("✅ cache hit within the TTL, separate entry per city")
+
+        time.sleep(0.6)
+        fetch_weather("mangaluru")
+        assert len(hits) == 3, "expired entry was not refetched"
+        print("✅ entry refetched after the TTL")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()